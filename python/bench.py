@@ -0,0 +1,184 @@
+import argparse
+import base64
+import json
+import platform
+import sys
+import time
+import base58
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+from histogram import Histogram
+from sender import RPC_PREFIX, RPC_SUFFIX
+from template import TransactionTemplate
+from tips import TIP_PUBKEYS, tip_instruction
+
+"""
+Client-side micro-benchmarks of the send path
+
+main.py sends JSON-RPC with a base64 transaction, post_binary.py sends the raw bytes to /txb. This
+benchmark measures, offline, what each step before the network costs:
+- keypair_decode       Keypair.from_bytes(base58.b58decode(private_key))
+- instructions         transfer(TransferParams(...)) per transfer, plus the cached tip instruction
+- new_with_blockhash   Message.new_with_blockhash
+- new_with_nonce       Message.new_with_nonce
+- sign                 Transaction.new_unsigned + sign
+- bytes                bytes(transaction), the whole /txb body
+- base64               base64 encoding of the bytes
+- rpc_body             pre-rendered JSON-RPC envelope around the base64 (sender.py)
+- rpc_body_json        the same body built with json.dumps, as the examples used to
+- path_binary / path_rpc  sign + serialize + body, end to end for each format
+- template_render      TransactionTemplate.render (template.py), single transfer only
+
+The steps that depend on the transaction size run for every --instructions count. Every case is timed
+per iteration with time.perf_counter_ns into a histogram (see histogram.py).
+
+```
+python bench.py --output baseline.json
+python bench.py --baseline baseline.json --threshold 15
+```
+--output writes the histograms as JSON; with --baseline every case whose p50 got slower than the
+baseline by more than --threshold percent is reported and the exit code is 1.
+"""
+
+INSTRUCTION_COUNTS = [1, 4, 16]
+
+
+def time_case(function, iterations, warmup=100):
+    """Histogram of `iterations` timed calls of function(), after `warmup` untimed calls."""
+    for _ in range(warmup):
+        function()
+    histogram = Histogram()
+    clock = time.perf_counter_ns
+    for _ in range(iterations):
+        start = clock()
+        function()
+        histogram.record(clock() - start)
+    return histogram
+
+
+def build_cases(instruction_count):
+    """
+    Returns:
+        dict: Case name -> zero-argument callable, for transactions with `instruction_count` transfers
+    """
+    sender = Keypair()
+    private_key = base58.b58encode(bytes(sender)).decode()
+    payer = sender.pubkey()
+    receivers = [Pubkey.new_unique() for _ in range(instruction_count)]
+    blockhash = Hash.new_unique()
+    nonce_account = Pubkey.new_unique()
+
+    def instructions():
+        return [transfer(TransferParams(from_pubkey=payer, to_pubkey=receiver, lamports=1))
+                for receiver in receivers] + [tip_instruction(payer, TIP_PUBKEYS[0])]
+
+    built = instructions()
+    message = Message.new_with_blockhash(built, payer=payer, blockhash=blockhash)
+
+    def sign():
+        transaction = Transaction.new_unsigned(message)
+        transaction.sign([sender], blockhash)
+        return transaction
+
+    transaction = sign()
+    transaction_bytes = bytes(transaction)
+    transaction_base64 = base64.b64encode(transaction_bytes)
+
+    def rpc_body_json():
+        return json.dumps({
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "sendTransaction",
+            "params": [transaction_base64.decode("utf-8"), {"encoding": "base64"}],
+        }).encode()
+
+    cases = {
+        "instructions": instructions,
+        "new_with_blockhash": lambda: Message.new_with_blockhash(built, payer=payer, blockhash=blockhash),
+        "new_with_nonce": lambda: Message.new_with_nonce(built, payer=payer, nonce_account_pubkey=nonce_account,
+                                                         nonce_authority_pubkey=payer),
+        "sign": sign,
+        "bytes": lambda: bytes(transaction),
+        "base64": lambda: base64.b64encode(transaction_bytes),
+        "rpc_body": lambda: RPC_PREFIX + base64.b64encode(transaction_bytes) + RPC_SUFFIX,
+        "rpc_body_json": rpc_body_json,
+        "path_binary": lambda: bytes(sign()),
+        "path_rpc": lambda: RPC_PREFIX + base64.b64encode(bytes(sign())) + RPC_SUFFIX,
+    }
+    if instruction_count == 1:
+        cases["keypair_decode"] = lambda: Keypair.from_bytes(base58.b58decode(private_key))
+        template = TransactionTemplate.transfer(sender, receivers[0], TIP_PUBKEYS[0])
+        cases["template_render"] = lambda: template.render(blockhash)
+    return cases
+
+
+def run(instruction_counts, iterations):
+    """
+    Returns:
+        dict: "name[n=count]" -> Histogram
+    """
+    results = {}
+    for count in instruction_counts:
+        for name, function in build_cases(count).items():
+            results[f"{name}[n={count}]"] = time_case(function, iterations)
+    return results
+
+
+def print_report(results):
+    print(f"  {'case':<28}{'count':>8}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (us)")
+    for name, histogram in results.items():
+        summary = histogram.summary()
+        values = [summary[key] / 1e3 for key in ["mean", "p50", "p90", "p99", "max"]]
+        print(f"  {name:<28}{summary['count']:>8}" + "".join(f"{value:>9.2f}" for value in values))
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the p50 of every case against a previous run.
+
+    Returns:
+        list: Human readable regressions, empty if none
+    """
+    regressions = []
+    for name, histogram in results.items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        now, then = histogram.percentile(50), Histogram.from_dict(previous).percentile(50)
+        if then and (now - then) * 100 / then > threshold:
+            regressions.append(f"{name} p50: {then / 1e3:.2f}us -> {now / 1e3:.2f}us")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building, signing and serializing transactions")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed iterations per case.")
+    parser.add_argument("--instructions", type=int, action="append", default=[],
+                        help=f"Number of transfers per transaction, repeatable. Defaults to {INSTRUCTION_COUNTS}.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare against.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent.")
+    args = parser.parse_args()
+
+    results = run(args.instructions or INSTRUCTION_COUNTS, args.iterations)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": time.time(), "python": platform.python_version(),
+                       "cases": {name: histogram.to_dict() for name, histogram in results.items()}}, f)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import namedtuple
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+
+"""
+Background blockhash cache
+
+Fetching the latest blockhash right before building a transaction adds a full RPC round-trip to every
+send. BlockhashCache polls getLatestBlockhash and getBlockHeight in the background and hands out the
+newest hash immediately.
+
+A blockhash is valid for 150 blocks. The cache estimates the current block height from the last poll
+(one block about every 400ms) and refuses to hand out a hash that is older than max_age seconds or
+has fewer than min_remaining_blocks blocks left before last_valid_block_height.
+"""
+
+# Approximate duration of a slot, used to extrapolate the block height between polls.
+SLOT_DURATION = 0.4
+
+CachedBlockhash = namedtuple("CachedBlockhash", ["blockhash", "last_valid_block_height", "block_height", "fetched_at"])
+
+
+class StaleBlockhashError(Exception):
+    """Raised when the cached blockhash is missing, too old or too close to expiry."""
+
+
+class BlockhashCache:
+    """
+    Keeps the newest blockhash fetched in the background.
+
+    Args:
+        rpc_url (str): RPC endpoint used for getLatestBlockhash / getBlockHeight
+        poll_interval (float): Seconds between polls
+        max_age (float): Maximum age in seconds of a blockhash handed out by get()
+        min_remaining_blocks (int): Refuse a blockhash with fewer blocks left before it expires
+        commitment: Commitment used for both RPC calls
+    """
+
+    def __init__(self, rpc_url="https://api.mainnet-beta.solana.com", poll_interval=1.0, max_age=30,
+                 min_remaining_blocks=30, commitment=Confirmed):
+        self.client = AsyncClient(rpc_url, commitment=commitment)
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.min_remaining_blocks = min_remaining_blocks
+        self.latest = None
+        self._poll_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Fetch the first blockhash and start polling in the background."""
+        await self.refresh()
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        await self.client.close()
+
+    async def refresh(self):
+        """Fetch the latest blockhash and the current block height."""
+        latest_blockhash, block_height = await asyncio.gather(
+            self.client.get_latest_blockhash(),
+            self.client.get_block_height(),
+        )
+        self.latest = CachedBlockhash(
+            latest_blockhash.value.blockhash,
+            latest_blockhash.value.last_valid_block_height,
+            block_height.value,
+            time.monotonic(),
+        )
+        return self.latest
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the previous blockhash, get() refuses it once it becomes stale.
+                print("Blockhash refresh failed:", str(e))
+
+    def estimated_block_height(self, now=None):
+        """Block height extrapolated from the last poll."""
+        if self.latest is None:
+            return None
+        elapsed = (now if now is not None else time.monotonic()) - self.latest.fetched_at
+        return self.latest.block_height + int(elapsed / SLOT_DURATION)
+
+    def get(self):
+        """
+        Return the cached blockhash without any network access.
+
+        Returns:
+            CachedBlockhash: (blockhash, last_valid_block_height, block_height, fetched_at)
+
+        Raises:
+            StaleBlockhashError: No blockhash yet, or it is older than max_age or close to expiry
+        """
+        latest = self.latest
+        if latest is None:
+            raise StaleBlockhashError("No blockhash fetched yet")
+        now = time.monotonic()
+        age = now - latest.fetched_at
+        if age > self.max_age:
+            raise StaleBlockhashError(f"Blockhash is {age:.1f} seconds old")
+        remaining = latest.last_valid_block_height - self.estimated_block_height(now)
+        if remaining < self.min_remaining_blocks:
+            raise StaleBlockhashError(f"Blockhash expires in {remaining} blocks")
+        return latest
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import namedtuple
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+
+"""
+Batched confirmation tracker
+
+sendTransaction only returns the signature, it does not say whether the transaction landed. Polling
+getSignatureStatuses once per transaction does not scale, so ConfirmationTracker collects the
+outstanding signatures of every sender and queries them in batches of up to 256 (the RPC limit) at a
+fixed cadence. Each tracked signature gets a future that resolves with the slot it landed in and the
+landing latency, measured from the send until the poll that observed it.
+
+A signature expires when the block height passes the last_valid_block_height of its blockhash; its future
+then fails with ExpiredError. Durable nonce transactions have no block height limit, they expire when
+the nonce advances by another transaction (e.g. a sibling of a fan-out landed), call expire() for them.
+
+Usage:
+```
+async with ConfirmationTracker() as tracker:
+    signature = await client_for_send.send_transaction(transaction)
+    confirmation = await tracker.track(signature, latest_blockhash.last_valid_block_height)
+    print(confirmation.slot, confirmation.latency)
+```
+"""
+
+# getSignatureStatuses accepts at most 256 signatures per call
+MAX_SIGNATURES_PER_CALL = 256
+
+# Same order as int(TransactionConfirmationStatus)
+COMMITMENT_LEVEL = {
+    "processed": int(TransactionConfirmationStatus.Processed),
+    "confirmed": int(TransactionConfirmationStatus.Confirmed),
+    "finalized": int(TransactionConfirmationStatus.Finalized),
+}
+
+Confirmation = namedtuple("Confirmation", ["signature", "slot", "latency", "err"])
+
+
+class ExpiredError(Exception):
+    """Raised for a signature that can no longer land."""
+
+    def __init__(self, signature, reason):
+        super().__init__(f"{signature} expired: {reason}")
+        self.signature = signature
+        self.reason = reason
+
+
+class _Pending:
+    def __init__(self, signature, last_valid_block_height, sent_at, future):
+        self.signature = signature
+        self.last_valid_block_height = last_valid_block_height
+        self.sent_at = sent_at
+        self.future = future
+
+
+class ConfirmationTracker:
+    """
+    Resolves per-transaction futures from batched getSignatureStatuses polls.
+
+    Args:
+        rpc_url (str): RPC endpoint used for getSignatureStatuses / getBlockHeight
+        poll_interval (float): Seconds between polls
+        batch_size (int): Signatures per getSignatureStatuses call, at most 256
+        commitment (str): "processed", "confirmed" or "finalized", the level that resolves a future
+        blockhash_cache (BlockhashCache): Optional, its last block height avoids a getBlockHeight call per poll
+    """
+
+    def __init__(self, rpc_url="https://api.mainnet-beta.solana.com", poll_interval=0.5,
+                 batch_size=MAX_SIGNATURES_PER_CALL, commitment="confirmed", blockhash_cache=None):
+        self.client = AsyncClient(rpc_url, commitment=Confirmed)
+        self.poll_interval = poll_interval
+        self.batch_size = min(batch_size, MAX_SIGNATURES_PER_CALL)
+        self.level = COMMITMENT_LEVEL[commitment]
+        self.blockhash_cache = blockhash_cache
+        self.pending = {}
+        self.landed = 0
+        self.expired = 0
+        self._poll_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        for pending in self.pending.values():
+            pending.future.cancel()
+        self.pending.clear()
+        await self.client.close()
+
+    def track(self, signature, last_valid_block_height=None, sent_at=None):
+        """
+        Start tracking a sent transaction.
+
+        Args:
+            signature: Signature or base58 string returned by the sender
+            last_valid_block_height (int): Expiry of the blockhash, None for durable nonce transactions
+            sent_at (float): time.monotonic() of the send, defaults to now
+
+        Returns:
+            asyncio.Future: Resolves with a Confirmation, fails with ExpiredError
+        """
+        key = str(signature)
+        pending = self.pending.get(key)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            pending = _Pending(Signature.from_string(key), last_valid_block_height,
+                               sent_at if sent_at is not None else time.monotonic(), future)
+            self.pending[key] = pending
+        return pending.future
+
+    def expire(self, signature, reason="nonce advanced"):
+        """Stop tracking a signature that can no longer land."""
+        pending = self.pending.pop(str(signature), None)
+        if pending is not None and not pending.future.done():
+            self.expired += 1
+            pending.future.set_exception(ExpiredError(str(signature), reason))
+
+    def land_rate(self):
+        """Landed share of the resolved signatures, None before the first one."""
+        resolved = self.landed + self.expired
+        return self.landed / resolved if resolved else None
+
+    async def _block_height(self):
+        if not any(pending.last_valid_block_height is not None for pending in self.pending.values()):
+            return None
+        if self.blockhash_cache is not None and self.blockhash_cache.latest is not None:
+            # The last observed height, not the extrapolated one: skipped slots make the extrapolation
+            # run ahead, and expiring a signature too early would hide a landing.
+            return self.blockhash_cache.latest.block_height
+        return (await self.client.get_block_height()).value
+
+    async def poll(self):
+        """Query every pending signature once and resolve the ones that landed or expired."""
+        # The block height is read before the statuses: a signature without status at a later
+        # height than its last valid one can no longer land.
+        block_height = await self._block_height()
+        pending = [p for p in self.pending.values() if not p.future.cancelled()]
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        responses = await asyncio.gather(*(self.client.get_signature_statuses([p.signature for p in batch])
+                                           for batch in batches))
+        now = time.monotonic()
+        for batch, response in zip(batches, responses):
+            for item, status in zip(batch, response.value):
+                key = str(item.signature)
+                if status is not None and status.confirmation_status is not None \
+                        and int(status.confirmation_status) >= self.level:
+                    self.pending.pop(key, None)
+                    self.landed += 1
+                    if not item.future.done():
+                        item.future.set_result(Confirmation(key, status.slot, now - item.sent_at, status.err))
+                elif status is None and block_height is not None \
+                        and item.last_valid_block_height is not None and block_height > item.last_valid_block_height:
+                    self.expire(key, f"block height {block_height} > {item.last_valid_block_height}")
+        for key in [key for key, p in self.pending.items() if p.future.cancelled()]:
+            del self.pending[key]
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.pending:
+                continue
+            try:
+                await self.poll()
+            except Exception as e:
+                print("Signature status poll failed:", str(e))
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import socket
+import ssl
+import weakref
+from urllib.parse import urlsplit
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+from sender import REGIONS, KEEPALIVE_TIMEOUT
+
+"""
+Connection layer: DNS cache, TLS session resumption and plain-HTTP endpoints
+
+A socket that 0slot.trade closed after the 65 second idle timeout, or that dropped, is normally reopened
+with a resolver lookup, the TCP handshake and a full TLS handshake, three round-trips or more before the
+transaction is written. ConnectionLayer removes what it can from that path:
+- every region host is resolved once at startup and kept in a CachedResolver, refreshed in the
+  background, so a reconnect never waits for DNS
+- ResumingSSLContext hands the last TLS session (ticket) of a host to every new connection to it, so a
+  reconnect over HTTPS does an abbreviated handshake instead of a full one
+- the plain-HTTP endpoints from the sales team (e.g. http://de1.0slot.trade) are preferred over HTTPS
+  whenever they are configured and resolve
+
+Only plain HTTP gets a reconnect down to a single round-trip (the TCP handshake). Over HTTPS a resumed
+session still costs one TLS round-trip on top, it only saves the certificate exchange and key agreement.
+
+The sales endpoints are passed as http_endpoints or in the ZEROSLOT_HTTP_ENDPOINTS environment variable
+("de=http://de1.0slot.trade,ny=http://ny1.0slot.trade"). The Sender keeps connections_per_region sockets
+open per region on top of this layer (see sender.py).
+
+Usage:
+```
+async with ConnectionLayer(http_endpoints={"de": "http://de1.0slot.trade"}) as connections:
+    async with Sender(api_key, regions=["de"], connection_layer=connections) as client_for_send:
+        signature = await client_for_send.send_transaction(transaction)
+```
+"""
+
+HTTP_ENDPOINTS_ENV = "ZEROSLOT_HTTP_ENDPOINTS"
+
+# Re-resolve the hosts every 5 minutes, the cached addresses are served in between
+DNS_REFRESH_INTERVAL = 300
+
+
+def http_endpoints_from_env():
+    """region -> URL from ZEROSLOT_HTTP_ENDPOINTS, empty if it is not set."""
+    value = os.environ.get(HTTP_ENDPOINTS_ENV, "")
+    return dict(item.strip().split("=", 1) for item in value.split(",") if item.strip())
+
+
+class CachedResolver(AbstractResolver):
+    """
+    aiohttp resolver answering from a cache filled up front, lookups of unknown hosts are cached too.
+    """
+
+    def __init__(self):
+        self._resolver = DefaultResolver()
+        self._cache = {}
+
+    async def _lookup(self, host, port, family):
+        hosts = await self._resolver.resolve(host, port, family)
+        self._cache[host, port, family] = hosts
+        return hosts
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        hosts = self._cache.get((host, port, family))
+        if hosts is None:
+            hosts = await self._lookup(host, port, family)
+        return hosts
+
+    async def refresh(self):
+        """Resolve every cached host again, keeping the previous addresses of a failed lookup."""
+        keys = list(self._cache)
+        results = await asyncio.gather(*(self._lookup(*key) for key in keys), return_exceptions=True)
+        return {key[0]: result for key, result in zip(keys, results) if isinstance(result, Exception)}
+
+    async def close(self):
+        await self._resolver.close()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    SSLContext that resumes the last TLS session of a host on new connections.
+
+    asyncio creates the TLS object of every connection through wrap_bio(); the override passes the
+    cached session of the server_hostname. The sessions are harvested from the live connections, call
+    harvest() after traffic (the Sender does on every heartbeat), since TLS 1.3 tickets arrive after
+    the handshake.
+
+    Attributes:
+        offered (int): Connections that were offered a cached session
+        resumed (int): Offered connections whose handshake the server actually resumed, counted by harvest()
+    """
+
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        return super().__new__(cls, protocol, *args, **kwargs)
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        super().__init__()
+        self.load_default_certs()
+        self.sessions = {}
+        self.offered = 0
+        self.resumed = 0
+        self._objects = {}
+        # Offered connections whose handshake has not been checked yet
+        self._unchecked = weakref.WeakSet()
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side and server_hostname is not None:
+            self.harvest(server_hostname)
+            session = self.sessions.get(server_hostname)
+        try:
+            ssl_object = super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+        except ValueError:
+            # Session from a different context or protocol, start over with a full handshake
+            self.sessions.pop(server_hostname, None)
+            ssl_object = super().wrap_bio(incoming, outgoing, server_side, server_hostname)
+            session = None
+        if session is not None:
+            # The server may still reject the session, harvest() counts the resumptions
+            self.offered += 1
+            self._unchecked.add(ssl_object)
+        if server_hostname is not None:
+            self._objects.setdefault(server_hostname, weakref.WeakSet()).add(ssl_object)
+        return ssl_object
+
+    def harvest(self, server_hostname=None):
+        """Cache the newest session of every (or one) host from its live connections."""
+        for ssl_object in list(self._unchecked):
+            # version() is None until the handshake completed
+            if ssl_object.version() is not None:
+                self._unchecked.discard(ssl_object)
+                self.resumed += ssl_object.session_reused
+        hostnames = [server_hostname] if server_hostname is not None else list(self._objects)
+        for hostname in hostnames:
+            for ssl_object in list(self._objects.get(hostname, ())):
+                try:
+                    session = ssl_object.session
+                except (ValueError, ssl.SSLError):
+                    continue
+                if session is not None and (session.has_ticket or session.id):
+                    self.sessions[hostname] = session
+
+
+class ConnectionLayer:
+    """
+    Shared DNS cache, TLS session cache and endpoint choice for Senders.
+
+    Args:
+        endpoints (dict): region -> HTTPS base URL, defaults to REGIONS of sender.py
+        http_endpoints (dict): region -> plain-HTTP sales endpoint, defaults to ZEROSLOT_HTTP_ENDPOINTS
+        dns_refresh_interval (float): Seconds between background re-resolutions
+        family (int): Address family to resolve, 0 for both IPv4 and IPv6
+
+    Attributes:
+        endpoints (dict): region -> chosen base URL, the HTTP endpoint when it resolved at start()
+    """
+
+    def __init__(self, endpoints=None, http_endpoints=None, dns_refresh_interval=DNS_REFRESH_INTERVAL,
+                 family=socket.AF_INET):
+        self.https_endpoints = dict(endpoints or REGIONS)
+        self.http_endpoints = dict(http_endpoints if http_endpoints is not None else http_endpoints_from_env())
+        self.endpoints = dict(self.https_endpoints)
+        self.dns_refresh_interval = dns_refresh_interval
+        self.family = family
+        self.resolver = CachedResolver()
+        self.ssl_context = ResumingSSLContext()
+        self._refresh_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _resolve(self, url):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        return await self.resolver.resolve(parts.hostname, port, self.family)
+
+    async def start(self):
+        """Resolve every endpoint and choose the plain-HTTP one for the regions where it resolves."""
+        regions = list(self.https_endpoints)
+        http_regions = list(self.http_endpoints)
+        results = await asyncio.gather(*(self._resolve(self.https_endpoints[region]) for region in regions),
+                                       *(self._resolve(self.http_endpoints[region]) for region in http_regions),
+                                       return_exceptions=True)
+        for region, result in zip(regions, results):
+            if isinstance(result, Exception):
+                print(f"Resolving {self.https_endpoints[region]} failed: {result}")
+        for region, result in zip(http_regions, results[len(regions):]):
+            if isinstance(result, Exception):
+                print(f"Resolving {self.http_endpoints[region]} failed, using HTTPS: {result}")
+            else:
+                self.endpoints[region] = self.http_endpoints[region]
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        await self.resolver.close()
+
+    def connector(self, limit, keepalive_timeout=KEEPALIVE_TIMEOUT):
+        """TCPConnector resolving from the cache and resuming TLS sessions."""
+        return aiohttp.TCPConnector(
+            limit=limit,
+            keepalive_timeout=keepalive_timeout,
+            resolver=self.resolver,
+            # The resolver caches, aiohttp's own cache would only hold a copy
+            use_dns_cache=False,
+            ssl=self.ssl_context,
+            family=self.family,
+        )
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.dns_refresh_interval)
+            for host, error in (await self.resolver.refresh()).items():
+                print(f"Resolving {host} failed, keeping the cached addresses: {error}")
@@ -0,0 +1,388 @@
+import asyncio
+import argparse
+import itertools
+import os
+import stat
+import struct
+import tempfile
+import time
+from collections import namedtuple
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.system_program import TransferParams, transfer
+from blockhash import BlockhashCache
+from connection import ConnectionLayer
+from sender import Sender, SendError
+from signer import SignerRegistry
+from tips import MIN_TIP_LAMPORTS, RoundRobin, tip_instruction
+
+"""
+Local sender daemon
+
+Every run of main.py pays interpreter startup, importing solana / solders / aiohttp, creating the clients
+and a cold connection before the transaction goes out, hundreds of milliseconds in total. The daemon
+pays all of that once: it keeps the Sender connections warm, the BlockhashCache polling and the keypairs
+loaded, and strategy processes submit over a Unix domain socket, a local IPC hop.
+
+Every message is a frame: a 4-byte big-endian length followed by the payload.
+
+Request payload: kind (u8), request id (u32), flags (u8), region length (u8), region (ascii), body
+- KIND_SIGNED: body is a signed, serialized transaction, sent as is
+- KIND_INTENT: body is payer (32 bytes), receiver (32 bytes), lamports (u64), tip lamports (u64);
+  the daemon builds, tips and signs the transfer with the payer's keypair and a cached blockhash
+An empty region lets the Sender choose, FLAG_BINARY sends to /txb instead of JSON-RPC.
+
+Reply payload: request id (u32), status (u8), error code (i32), build ns (u64), send ns (u64), text
+- status STATUS_OK: text is the signature (JSON-RPC) or the response body (/txb)
+- otherwise text is the error message, the code is the 0slot.trade error code if there is one
+build ns covers decoding, building and signing in the daemon, send ns the HTTP request.
+
+Anyone who can connect to the socket can make the daemon sign with its keypairs, so the socket lives in a
+directory only the user can enter and is itself mode 0600. DEFAULT_SOCKET is $XDG_RUNTIME_DIR/0slot/sender.sock,
+or /tmp/0slot-<uid>/sender.sock without it; the daemon refuses to start in a directory that is a symlink,
+belongs to another user or is open to group or others.
+A daemon refuses to start when another one already answers on its socket; a socket nobody answers on is
+left over by a crashed run and replaced.
+
+Replies may arrive out of order, the request id matches them. Run the daemon, then submit:
+```
+python daemon.py --api_key KEY --private_key PRIVATE_KEY --region de
+```
+```
+async with DaemonClient(DEFAULT_SOCKET) as client:
+    reply = await client.send_signed(transaction)
+    reply = await client.send_intent(payer, receiver, lamports=1)
+    print(reply.signature, reply.build_ns, reply.send_ns, reply.round_trip_ns)
+```
+"""
+
+DEFAULT_SOCKET = os.path.join(os.environ["XDG_RUNTIME_DIR"], "0slot", "sender.sock") \
+    if os.environ.get("XDG_RUNTIME_DIR") else os.path.join(tempfile.gettempdir(), f"0slot-{os.getuid()}", "sender.sock")
+
+KIND_SIGNED = 1
+KIND_INTENT = 2
+
+FLAG_BINARY = 1
+
+STATUS_OK = 0
+STATUS_SEND_ERROR = 1
+STATUS_ERROR = 2
+
+FRAME_LENGTH = struct.Struct(">I")
+REQUEST_HEADER = struct.Struct(">BIBB")
+INTENT = struct.Struct(">32s32sQQ")
+REPLY_HEADER = struct.Struct(">IBiQQ")
+
+DaemonReply = namedtuple("DaemonReply", ["signature", "build_ns", "send_ns", "round_trip_ns"])
+
+
+class DaemonError(Exception):
+    """
+    Raised by DaemonClient for a request the daemon could not send.
+
+    Attributes:
+        code (int): 0slot.trade error code, 0 if the error happened in the daemon
+        message (str): Error message
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}" if code else message)
+        self.code = code
+        self.message = message
+
+
+def frame(payload):
+    return FRAME_LENGTH.pack(len(payload)) + payload
+
+
+def private_directory(path):
+    """
+    Create a directory only the current user can enter, or check that an existing one is.
+
+    Raises:
+        PermissionError: The directory is a symlink, belongs to another user or is open to group or others
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    status = os.lstat(path)
+    if stat.S_ISLNK(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by the current user with mode 0700")
+
+
+async def socket_in_use(socket_path):
+    """True if a server accepts connections on a Unix domain socket."""
+    try:
+        _, writer = await asyncio.open_unix_connection(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    writer.close()
+    return True
+
+
+async def read_frame(reader):
+    """Read one frame, raises asyncio.IncompleteReadError when the peer closes the connection."""
+    (length,) = FRAME_LENGTH.unpack(await reader.readexactly(FRAME_LENGTH.size))
+    return await reader.readexactly(length)
+
+
+class SenderDaemon:
+    """
+    Serves send requests on a Unix domain socket with warm connections, blockhash and keypairs.
+
+    Args:
+        client_for_send (Sender): Warm sender, started and closed by the caller
+        client_for_blockhash (BlockhashCache): Blockhash source for intents, started and closed by the caller
+        signers (SignerRegistry): Keypairs that may sign intents, looked up by the payer of the intent
+        socket_path (str): Path of the Unix domain socket
+        tip_policy: Tip account rotation from tips.py, defaults to RoundRobin
+    """
+
+    def __init__(self, client_for_send, client_for_blockhash, signers=None, socket_path=DEFAULT_SOCKET,
+                 tip_policy=None):
+        self.client_for_send = client_for_send
+        self.client_for_blockhash = client_for_blockhash
+        self.signers = signers or SignerRegistry()
+        self.socket_path = socket_path
+        self.tip_policy = tip_policy or RoundRobin()
+        self._server = None
+        self._tasks = set()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """
+        Listen on the socket.
+
+        Raises:
+            RuntimeError: Another daemon is listening on the socket
+            PermissionError: The socket's directory is not private, see private_directory()
+        """
+        if self._server is not None:
+            return
+        private_directory(os.path.dirname(os.path.abspath(self.socket_path)))
+        if os.path.exists(self.socket_path):
+            if await socket_in_use(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            # Left over by a previous run
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+    async def close(self):
+        if self._server is None:
+            # Never started, the socket may belong to another daemon
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                payload = await read_frame(reader)
+                # Requests of one connection are served concurrently, the reply carries the request id
+                task = asyncio.create_task(self._handle_request(payload, writer))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def build_intent(self, body, region):
+        """Build and sign the tipped transfer described by an intent body."""
+        payer, receiver, lamports, tip_lamports = INTENT.unpack(body)
+        payer = Pubkey.from_bytes(payer)
+        if payer not in self.signers:
+            raise ValueError(f"No keypair loaded for payer {payer}")
+        latest_blockhash = self.client_for_blockhash.get()
+        main_transfer_instruction = transfer(TransferParams(
+            from_pubkey=payer, to_pubkey=Pubkey.from_bytes(receiver), lamports=lamports))
+        tip_transfer_instruction = tip_instruction(payer, self.tip_policy.choose(region), tip_lamports)
+        message = Message.new_with_blockhash([main_transfer_instruction, tip_transfer_instruction],
+                                             payer=payer, blockhash=latest_blockhash.blockhash)
+        (transaction,) = await self.signers.sign_batch([message])
+        return transaction
+
+    async def _handle_request(self, payload, writer):
+        start = time.perf_counter_ns()
+        request_id = 0
+        build_ns = send_ns = 0
+        try:
+            kind, request_id, flags, region_length = REQUEST_HEADER.unpack_from(payload)
+            offset = REQUEST_HEADER.size
+            region = payload[offset:offset + region_length].decode() or None
+            body = payload[offset + region_length:]
+            if kind == KIND_SIGNED:
+                transaction = body
+            elif kind == KIND_INTENT:
+                transaction = await self.build_intent(body, region)
+            else:
+                raise ValueError(f"Unknown request kind {kind}")
+            sent = time.perf_counter_ns()
+            build_ns = sent - start
+            if flags & FLAG_BINARY:
+                result = await self.client_for_send.send_binary(transaction, region=region)
+            else:
+                result = await self.client_for_send.send_transaction(transaction, region=region)
+            send_ns = time.perf_counter_ns() - sent
+            reply = REPLY_HEADER.pack(request_id, STATUS_OK, 0, build_ns, send_ns) + str(result).encode()
+        except SendError as e:
+            send_ns = time.perf_counter_ns() - start - build_ns
+            reply = REPLY_HEADER.pack(request_id, STATUS_SEND_ERROR, int(e.code or 0), build_ns, send_ns) \
+                + str(e.message).encode()
+        except Exception as e:
+            reply = REPLY_HEADER.pack(request_id, STATUS_ERROR, 0, build_ns, send_ns) \
+                + f"{type(e).__name__}: {e}".encode()
+        if not writer.is_closing():
+            writer.write(frame(reply))
+
+
+class DaemonClient:
+    """
+    Client of a SenderDaemon, multiplexes concurrent requests over one connection.
+
+    Args:
+        socket_path (str): Path of the daemon's Unix domain socket
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET):
+        self.socket_path = socket_path
+        self._reader = None
+        self._writer = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._read_task = None
+        self._closed_reason = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        self._closed_reason = None
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _read_loop(self):
+        reason = "Daemon connection closed"
+        try:
+            while True:
+                payload = await read_frame(self._reader)
+                request_id, status, code, build_ns, send_ns = REPLY_HEADER.unpack_from(payload)
+                text = payload[REPLY_HEADER.size:].decode()
+                entry = self._pending.pop(request_id, None)
+                if entry is None:
+                    continue
+                future, start = entry
+                if future.done():
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(DaemonReply(text, build_ns, send_ns, time.perf_counter_ns() - start))
+                else:
+                    future.set_exception(DaemonError(code, text))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            reason = f"Daemon connection closed: {e}"
+        finally:
+            # Nothing resolves a request from now on, fail the waiting ones and refuse new ones
+            self._closed_reason = reason
+            for future, _ in self._pending.values():
+                if not future.done():
+                    future.set_exception(DaemonError(0, reason))
+            self._pending.clear()
+
+    async def _request(self, kind, body, region, binary):
+        if self._read_task is None or self._read_task.done() or self._writer.is_closing():
+            raise DaemonError(0, self._closed_reason or "Not connected to the daemon")
+        request_id = next(self._ids) & 0xFFFFFFFF
+        region_bytes = (region or "").encode()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (future, time.perf_counter_ns())
+        header = REQUEST_HEADER.pack(kind, request_id, FLAG_BINARY if binary else 0, len(region_bytes))
+        self._writer.write(frame(header + region_bytes + body))
+        return await future
+
+    async def send_signed(self, transaction, region=None, binary=False):
+        """
+        Send a pre-signed transaction through the daemon.
+
+        Args:
+            transaction: Signed solders Transaction / VersionedTransaction or its serialized bytes
+            region (str): Region to send to, defaults to the daemon's choice
+            binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+
+        Returns:
+            DaemonReply: (signature, build_ns, send_ns, round_trip_ns)
+        """
+        return await self._request(KIND_SIGNED, bytes(transaction), region, binary)
+
+    async def send_intent(self, payer, receiver, lamports, tip_lamports=MIN_TIP_LAMPORTS, region=None, binary=False):
+        """
+        Let the daemon build, tip and sign a transfer with its cached blockhash and the payer's keypair.
+
+        Args:
+            payer (Pubkey): Payer, its keypair must be loaded in the daemon
+            receiver (Pubkey): Receiver of the transfer
+            lamports (int): Amount to transfer
+            tip_lamports (int): Tip, at least 0.001 SOL
+            region (str): Region to send to, defaults to the daemon's choice
+            binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+
+        Returns:
+            DaemonReply: (signature, build_ns, send_ns, round_trip_ns)
+        """
+        body = INTENT.pack(bytes(payer), bytes(receiver), lamports, tip_lamports)
+        return await self._request(KIND_INTENT, body, region, binary)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a local 0slot.trade sender daemon")
+    parser.add_argument("--api_key", required=True, help="Solana API key for accessing the network.")
+    parser.add_argument("--private_key", action="append", default=[], help="Keypair allowed to sign intents, repeatable.")
+    parser.add_argument("--region", action="append", default=[], help="Region to keep warm, repeatable. Defaults to all.")
+    parser.add_argument("--url", action="append", default=[], metavar="REGION=URL",
+                        help="Preferred region endpoint, repeatable, e.g. the HTTP endpoints from the sales team. "
+                             "Defaults to ZEROSLOT_HTTP_ENDPOINTS.")
+    parser.add_argument("--rpc_url", default="https://api.mainnet-beta.solana.com", help="RPC endpoint for blockhashes.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Path of the Unix domain socket.")
+    args = parser.parse_args()
+
+    signers = SignerRegistry(args.private_key)
+    endpoints = dict(url.split("=", 1) for url in args.url)
+    regions = args.region or list(endpoints) or None
+    # Cached DNS and TLS sessions make reconnects after the idle timeout cheap (see connection.py)
+    async with ConnectionLayer(http_endpoints=endpoints or None) as connections, \
+            BlockhashCache(args.rpc_url) as client_for_blockhash, \
+            Sender(args.api_key, regions=regions, connection_layer=connections) as client_for_send, \
+            SenderDaemon(client_for_send, client_for_blockhash, signers, args.socket) as daemon:
+        print(f"Listening on {args.socket}")
+        await daemon.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
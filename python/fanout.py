@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import defaultdict, deque, namedtuple
+from solders.message import Message
+from solders.pubkey import Pubkey
+from signer import SignerRegistry, with_blockhash
+from tips import MIN_TIP_LAMPORTS, TIP_ACCOUNTS, tip_instruction, tip_pubkey
+
+"""
+Multi-region fan-out with durable nonce
+
+The same instructions are sent to every region at once, each copy with its own tip account so the
+copies are distinct transactions (as if sent through different landing services). All copies use
+the same durable nonce: the first one to land advances the nonce and every other copy becomes
+invalid, so maximum redundancy never risks a double execution.
+
+Usage:
+```
+fan_out = FanOut(client_for_send, nonce_account_pubkey, signers=signers)
+transactions = await fan_out.build(sender, instructions, nonce_hash, ["ny", "de", "ams"])
+results = await fan_out.send(transactions)
+```
+"""
+
+# Tip receiving addresses, a different one per region (see tips.py)
+REGION_TIP_ACCOUNTS = dict(zip(["de", "ny", "ams", "jp", "la"], TIP_ACCOUNTS))
+
+RegionResult = namedtuple("RegionResult", ["region", "signature", "latency", "error"])
+
+
+class FanOut:
+    """
+    Builds one durable-nonce transaction per region and sends them concurrently.
+
+    Args:
+        client_for_send (Sender): Warm sender connected to every region used
+        nonce_account_pubkey (Pubkey): Nonce account shared by all copies, can also be given per build()
+        tip_accounts (dict): region -> tip account, defaults to REGION_TIP_ACCOUNTS
+        tip_policy: Rotation policy from tips.py choosing the tip account per build and region, overrides tip_accounts
+        tip_lamports (int): Tip per copy, at least 0.001 SOL
+        binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+        history (int): Number of acceptance latencies kept per region
+        signers (SignerRegistry): Keypairs of the payer and the nonce authority, signing every copy in one
+            sign_batch() call, see signer.py
+    """
+
+    def __init__(self, client_for_send, nonce_account_pubkey=None, tip_accounts=None, tip_lamports=MIN_TIP_LAMPORTS,
+                 binary=False, history=1000, tip_policy=None, signers=None):
+        self.client_for_send = client_for_send
+        self.signers = signers or SignerRegistry()
+        self.nonce_account_pubkey = nonce_account_pubkey
+        self.tip_accounts = {
+            region: tip_pubkey(tip)
+            for region, tip in (tip_accounts or REGION_TIP_ACCOUNTS).items()
+        }
+        self.tip_lamports = tip_lamports
+        self.tip_policy = tip_policy
+        self.binary = binary
+        self.latencies = defaultdict(lambda: deque(maxlen=history))
+
+    async def build(self, sender, instructions, nonce_hash, regions, nonce_authority=None, nonce_account_pubkey=None):
+        """
+        Build and sign one transaction per region.
+
+        Args:
+            sender: Payer and signer, a Keypair (registered on first use) or the Pubkey of a registered keypair
+            instructions (list): Instructions shared by every copy, the tip is appended per region
+            nonce_hash (Hash): Current value of the nonce account
+            regions (list): Regions to build for
+            nonce_authority (Pubkey): Nonce authority, defaults to the sender
+            nonce_account_pubkey (Pubkey): Nonce account of this fan-out, e.g. from a NoncePool, defaults to the one given to FanOut
+
+        Returns:
+            dict: region -> signed Transaction
+        """
+        payer = sender if isinstance(sender, Pubkey) else self.signers.load(sender).pubkey()
+        nonce_authority = nonce_authority or payer
+        nonce_account_pubkey = nonce_account_pubkey or self.nonce_account_pubkey
+        messages = []
+        for region in regions:
+            tip_account = self.tip_policy.choose(region) if self.tip_policy else self.tip_accounts[region]
+            message = Message.new_with_nonce(
+                list(instructions) + [tip_instruction(payer, tip_account, self.tip_lamports)],
+                payer=payer,
+                nonce_account_pubkey=nonce_account_pubkey,
+                nonce_authority_pubkey=nonce_authority,
+            )
+            # new_with_nonce leaves the blockhash empty, the nonce value takes its place
+            messages.append(with_blockhash(message, nonce_hash))
+        return dict(zip(regions, await self.signers.sign_batch(messages)))
+
+    async def _send(self, region, transaction):
+        start_time = time.perf_counter()
+        try:
+            if self.binary:
+                signature = await self.client_for_send.send_binary(transaction, region=region)
+            else:
+                signature = await self.client_for_send.send_transaction(transaction, region=region)
+        except Exception as e:
+            return RegionResult(region, None, time.perf_counter() - start_time, e)
+        latency = time.perf_counter() - start_time
+        self.latencies[region].append(latency)
+        return RegionResult(region, signature, latency, None)
+
+    async def send(self, transactions):
+        """
+        Send every copy concurrently.
+
+        Args:
+            transactions (dict): region -> signed transaction, as returned by build()
+
+        Returns:
+            list: RegionResult per region, ordered by acceptance latency
+        """
+        results = await asyncio.gather(*(self._send(region, transaction)
+                                         for region, transaction in transactions.items()))
+        return sorted(results, key=lambda result: result.latency)
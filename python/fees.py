@@ -0,0 +1,199 @@
+import asyncio
+import time
+from collections import defaultdict
+import aiohttp
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+
+"""
+Priority fee oracle
+
+A transaction with only the main transfer and the tip pays no priority fee and requests the default
+compute budget, so under congestion it competes poorly even when it reaches the leader through
+staked_conn. FeeOracle polls getRecentPrioritizationFees for the accounts the transactions write to, keeps
+the fees of the last `window` slots, and turns a percentile of them into a compute unit price:
+
+    price = min(max(percentile(recent fees), min_price), max_price)     (micro-lamports per compute unit)
+
+e.g. FeePolicy(percentile=75, max_price=50000) is "p75 capped at 50000". The SetComputeUnitLimit and
+SetComputeUnitPrice instructions are rebuilt only when the price changes after a poll; instructions()
+returns the cached list, so the builders never wait for an RPC call.
+
+A system transfer uses 150 compute units and each compute budget instruction another 150, so the
+default limit of 1000 covers the main transfer, the tip and the two budget instructions. Priority fee
+in lamports = price * unit_limit / 1e6.
+
+LandingEfficiency tracks the key metric, landed transactions per lamport spent on tips and fees. The
+Rebroadcaster records every finished transaction in it (efficiency=, see rebroadcast.py), main.py and
+post_binary.py record their transaction with --confirm.
+
+Usage:
+```
+async with FeeOracle(accounts=[receiver], policy=FeePolicy(75, max_price=50000)) as fee_oracle:
+    instructions = fee_oracle.instructions() + [main_transfer_instruction, tip_transfer_instruction]
+```
+"""
+
+# Compute units for a transfer, a tip and the two compute budget instructions
+DEFAULT_UNIT_LIMIT = 1000
+# getRecentPrioritizationFees accepts at most 128 accounts
+MAX_FEE_ACCOUNTS = 128
+# Number of slots the RPC node reports, and the default window
+RECENT_SLOTS = 150
+
+
+class FeePolicy:
+    """
+    Compute unit price from recent prioritization fees.
+
+    Args:
+        percentile (float): Percentile of the recent fees to pay, 0 - 100
+        max_price (int): Upper bound in micro-lamports per compute unit
+        min_price (int): Lower bound in micro-lamports per compute unit
+    """
+
+    def __init__(self, percentile=75, max_price=1000000, min_price=0):
+        self.percentile = percentile
+        self.max_price = max_price
+        self.min_price = min_price
+
+    def price(self, fees):
+        """
+        Args:
+            fees (list): Sorted prioritization fees of recent slots
+
+        Returns:
+            int: Compute unit price in micro-lamports
+        """
+        if not fees:
+            return self.min_price
+        # Nearest rank
+        index = min(len(fees) - 1, max(0, int(len(fees) * self.percentile / 100.0 + 0.5) - 1))
+        return int(min(max(fees[index], self.min_price), self.max_price))
+
+
+class FeeOracle:
+    """
+    Polls recent prioritization fees in the background and caches the compute budget instructions.
+
+    Args:
+        rpc_url (str): RPC endpoint used for getRecentPrioritizationFees
+        accounts (list): Writable accounts of the transactions (Pubkey or base58), at most 128
+        policy (FeePolicy): Price policy, defaults to p75 capped at 1000000 micro-lamports
+        unit_limit (int): Compute unit limit requested by every transaction
+        poll_interval (float): Seconds between polls
+        window (int): Number of most recent slots the percentile is taken over
+    """
+
+    def __init__(self, rpc_url="https://api.mainnet-beta.solana.com", accounts=(), policy=None,
+                 unit_limit=DEFAULT_UNIT_LIMIT, poll_interval=2.0, window=RECENT_SLOTS):
+        self.rpc_url = rpc_url
+        self.accounts = [str(account) for account in accounts][:MAX_FEE_ACCOUNTS]
+        self.policy = policy or FeePolicy()
+        self.unit_limit = unit_limit
+        self.poll_interval = poll_interval
+        self.window = window
+        self.fees = {}
+        self.price = None
+        self.updated_at = None
+        self._instructions = None
+        self._session = None
+        self._poll_task = None
+        self._set_price(self.policy.min_price)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Fetch the fees once and start polling in the background."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Sending with the minimum price beats not sending
+            print("Prioritization fee poll failed:", str(e))
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _set_price(self, price):
+        if price != self.price:
+            self.price = price
+            self._instructions = [set_compute_unit_limit(self.unit_limit), set_compute_unit_price(price)]
+
+    async def refresh(self):
+        """Poll getRecentPrioritizationFees and update the price."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        body = {"jsonrpc": "2.0", "id": 1, "method": "getRecentPrioritizationFees", "params": [self.accounts]}
+        async with self._session.post(self.rpc_url, json=body) as response:
+            result = await response.json(content_type=None)
+        if "error" in result:
+            raise RuntimeError(f"{result['error'].get('code')} {result['error'].get('message')}")
+        for item in result["result"]:
+            self.fees[item["slot"]] = item["prioritizationFee"]
+        # Keep the most recent `window` slots
+        for slot in sorted(self.fees)[:-self.window]:
+            del self.fees[slot]
+        self._set_price(self.policy.price(sorted(self.fees.values())))
+        self.updated_at = time.monotonic()
+        return self.price
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep the previous price
+                print("Prioritization fee poll failed:", str(e))
+
+    def instructions(self):
+        """Cached [SetComputeUnitLimit, SetComputeUnitPrice], put them before the other instructions."""
+        return self._instructions
+
+    def priority_fee_lamports(self):
+        """Priority fee of one transaction at the current price."""
+        return self.price * self.unit_limit // 1000000
+
+
+class LandingEfficiency:
+    """
+    Landing rate per lamport spent on tips and priority fees, overall and per label (e.g. region or policy).
+    """
+
+    def __init__(self):
+        self.sent = defaultdict(int)
+        self.landed = defaultdict(int)
+        self.spent = defaultdict(int)
+
+    def record(self, tip_lamports, fee_lamports, landed, label=None):
+        """Record one transaction; only a landed transaction pays its tip and fee."""
+        for key in {None, label}:
+            self.sent[key] += 1
+            if landed:
+                self.landed[key] += 1
+                self.spent[key] += tip_lamports + fee_lamports
+
+    def summary(self, label=None):
+        sent, landed, spent = self.sent[label], self.landed[label], self.spent[label]
+        return {
+            "sent": sent,
+            "landed": landed,
+            "land_rate": landed / sent if sent else None,
+            "lamports_per_landing": spent / landed if landed else None,
+            "landings_per_sol": landed * 1e9 / spent if spent else None,
+        }
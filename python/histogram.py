@@ -0,0 +1,126 @@
+"""
+HDR-style latency histogram
+
+Values (nanoseconds from time.perf_counter_ns) are counted in log-linear buckets: exact below 256,
+then 128 buckets per power of two. That bounds the relative error of any reported value to below 1%
+while the memory use stays constant no matter how many values are recorded, so p99 / p99.9 / max
+can be tracked over millions of requests. Buckets are stored sparsely and serialize to JSON.
+"""
+
+# 2^SUB_BUCKET_BITS exact values, then 2^(SUB_BUCKET_BITS - 1) buckets per power of two
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def bucket_index(value):
+    """Index of the bucket `value` is counted in."""
+    length = value.bit_length()
+    if length <= SUB_BUCKET_BITS:
+        return value
+    shift = length - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+
+
+def bucket_range(index):
+    """(lowest, highest) value counted in the bucket `index`."""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    shift += 1
+    lowest = (SUB_BUCKET_HALF + offset) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class Histogram:
+    """
+    Log-linear histogram of non-negative integer values.
+
+    Attributes:
+        count (int): Number of recorded values
+        total (int): Sum of recorded values
+        min (int): Exact minimum, None when empty
+        max (int): Exact maximum, None when empty
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value, count=1):
+        value = int(value)
+        if value < 0:
+            value = 0
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile):
+        """
+        Value at `percentile` (0-100), reported as the highest value of its bucket.
+
+        Returns:
+            int: The value, None when the histogram is empty
+        """
+        if not self.count:
+            return None
+        if percentile >= 100:
+            return self.max
+        rank = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_range(index)[1], self.max)
+        return self.max
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Returns:
+            dict: count, min, mean, the requested percentiles (keyed "p50", "p99.9", ...) and max
+        """
+        result = {"count": self.count, "min": self.min, "mean": self.mean()}
+        for percentile in percentiles:
+            result[f"p{percentile:g}"] = self.percentile(percentile)
+        result["max"] = self.max
+        return result
+
+    def to_dict(self):
+        return {
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
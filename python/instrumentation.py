@@ -0,0 +1,172 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+import aiohttp
+from histogram import Histogram
+
+"""
+Hot-path instrumentation
+
+Instrumentation times every phase of a send and aggregates the durations (nanoseconds) in HDR-style
+histograms per phase and label set (see histogram.py), so recording costs a dictionary lookup and a
+few integer operations. Phases used in this directory:
+- connection_open   opening (warming up) the send connections, TLS handshake included
+- fee_fetch         first poll of the recent prioritization fees (see fees.py)
+- keypair_load      decoding the private key into a Keypair
+- blockhash_fetch   getting the recent blockhash (or nonce)
+- instruction_build creating the instructions and the message
+- sign              signing the transaction
+- serialize         bytes(transaction), plus base64 encoding for JSON-RPC (label encoding=base64 / binary)
+- http_write        from the start of the request until the body is written (includes acquiring a connection)
+- ttfb              from the written body until the response headers arrive
+- response_parse    reading and decoding the response body
+
+The aggregate is exposed as Prometheus text (prometheus()) and as a structured JSON log line (log()).
+Hooks receive every single measurement, e.g. log_hook() to log each one.
+
+Usage:
+```
+instrumentation = Instrumentation()
+client_for_send = Sender(api_key, instrumentation=instrumentation)
+stopwatch = instrumentation.stopwatch()
+sender = Keypair.from_bytes(base58.b58decode(private_key))
+stopwatch.lap("keypair_load")
+...
+print(instrumentation.prometheus())
+```
+"""
+
+PHASES = ["connection_open", "fee_fetch", "keypair_load", "blockhash_fetch", "instruction_build", "sign",
+          "serialize", "http_write", "ttfb", "response_parse"]
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Stopwatch:
+    """
+    Records consecutive phases: every lap() records the time since the previous lap.
+    """
+
+    def __init__(self, instrumentation, labels):
+        self.instrumentation = instrumentation
+        self.labels = labels
+        self.last = time.perf_counter_ns()
+
+    def lap(self, phase, **labels):
+        now = time.perf_counter_ns()
+        self.instrumentation.record(phase, now - self.last, **dict(self.labels, **labels))
+        self.last = now
+
+
+class Instrumentation:
+    """
+    Collects per-phase durations of the send path.
+
+    Args:
+        hooks (list): Callables hook(phase, duration_ns, labels) invoked on every measurement
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.histograms = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def record(self, phase, duration_ns, **labels):
+        key = (phase, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.record(duration_ns)
+        for hook in self.hooks:
+            hook(phase, duration_ns, labels)
+
+    @contextmanager
+    def phase(self, phase, **labels):
+        """Time the body of a with block as `phase`."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter_ns() - start, **labels)
+
+    async def timed(self, phase, awaitable, **labels):
+        """Await `awaitable` and record its duration as `phase`, to time concurrent steps of a gather() apart."""
+        with self.phase(phase, **labels):
+            return await awaitable
+
+    def stopwatch(self, **labels):
+        """Start a Stopwatch whose laps carry `labels`."""
+        return Stopwatch(self, labels)
+
+    def trace_config(self):
+        """
+        aiohttp TraceConfig recording http_write and ttfb.
+
+        Pass trace_request_ctx={"region": ...} to the request to label the measurements.
+        """
+        def labels(context):
+            return dict(context.trace_request_ctx or {})
+
+        async def on_request_start(session, context, params):
+            context.start = context.written = time.perf_counter_ns()
+
+        async def on_request_sent(session, context, params):
+            context.written = time.perf_counter_ns()
+
+        async def on_request_end(session, context, params):
+            if context.trace_request_ctx is None:
+                # Requests without a context (keep-alive heartbeats) are not part of the send path
+                return
+            now = time.perf_counter_ns()
+            self.record("http_write", context.written - context.start, **labels(context))
+            self.record("ttfb", now - context.written, **labels(context))
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_headers_sent.append(on_request_sent)
+        trace_config.on_request_chunk_sent.append(on_request_sent)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def snapshot(self):
+        """
+        Returns:
+            list: One dict per phase and label set with the histogram summary in nanoseconds
+        """
+        return [dict(phase=phase, labels=dict(labels), **histogram.summary())
+                for (phase, labels), histogram in sorted(self.histograms.items())]
+
+    def prometheus(self, name="zeroslot_send_phase_seconds"):
+        """
+        Returns:
+            str: Prometheus text exposition format, one summary with a phase label
+        """
+        lines = [f"# HELP {name} Duration of the phases of the transaction send path.",
+                 f"# TYPE {name} summary"]
+        for (phase, labels), histogram in sorted(self.histograms.items()):
+            label_text = ",".join([f'phase="{phase}"'] + [f'{key}="{value}"' for key, value in labels])
+            for quantile in QUANTILES:
+                value = histogram.percentile(quantile * 100) / 1e9
+                lines.append(f'{name}{{{label_text},quantile="{quantile:g}"}} {value:.9f}')
+            lines.append(f"{name}_sum{{{label_text}}} {histogram.total / 1e9:.9f}")
+            lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def log(self, logger=None, level=logging.INFO):
+        """Write the snapshot as one structured JSON log line."""
+        (logger or logging.getLogger("zeroslot.metrics")).log(level, json.dumps({"phases": self.snapshot()}))
+
+
+def log_hook(logger=None, level=logging.DEBUG):
+    """
+    Hook logging every measurement as a JSON line.
+    """
+    logger = logger or logging.getLogger("zeroslot.metrics")
+
+    def hook(phase, duration_ns, labels):
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({"phase": phase, "duration_ns": duration_ns, **labels}))
+
+    return hook
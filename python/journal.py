@@ -0,0 +1,236 @@
+import asyncio
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from template import read_compact_u16
+
+"""
+Binary send journal
+
+print() loses the outcome of every send, and text logs are too slow to write at volume and to query
+afterwards. Journal records every send attempt as a fixed-width binary record in a memory-mapped file:
+
+    timestamp_ns   i8   wall clock time of the attempt (time.time_ns())
+    region         8s   region name, ascii, zero padded
+    signature      64s  raw first signature of the transaction
+    payload_size   u4   serialized transaction size in bytes
+    serialize_ns   i8   bytes(transaction), plus base64 and the envelope for JSON-RPC
+    request_ns     i8   from the request start until the response headers (connection, write, ttfb)
+    response_ns    i8   reading and parsing the response body
+    http_status    u2   HTTP status, 0 if the connection failed
+    error_code     i4   0slot.trade error code (403, 419, ...), ERROR_CONNECTION, ERROR_UNKNOWN, 0 for success
+
+record() only appends a tuple to a list; every flush_interval seconds a background task hands the queued
+records to a worker thread, which packs them into the file and rotates it, so neither the send path nor
+the event loop touches the file. A file holds records_per_file
+records, then the journal rotates to the next one (prefix.00000.journal, prefix.00001.journal, ...).
+Every file is preallocated to records_per_file records (about 11 MB with the default of 100000) and
+cut to the records written when it is closed.
+
+read_journal() loads one or more files into a NumPy structured array. numpy is optional and only
+needed to read (see requirements.txt); without it, iter_journal() yields the records of one file as
+JournalRecord tuples:
+```
+async with Journal("/var/log/0slot/sends") as journal:
+    client_for_send = Sender(api_key, journal=journal)
+    ...
+records = read_journal("/var/log/0slot/sends")
+latency = records["request_ns"] + records["response_ns"]
+hour = (records["timestamp_ns"] // 3_600_000_000_000) % 24
+for region in set(records["region"]):
+    print(region, numpy.percentile(latency[records["region"] == region], [50, 99]))
+
+for path in journal_files("/var/log/0slot/sends"):
+    errors = sum(1 for record in iter_journal(path) if record.error_code)
+```
+"""
+
+# Header: magic, record size, number of records written
+HEADER = struct.Struct("<8sII")
+MAGIC = b"0SLOTJ01"
+RECORD = struct.Struct("<q8s64sIqqqHi")
+
+FIELDS = ["timestamp_ns", "region", "signature", "payload_size", "serialize_ns", "request_ns",
+          "response_ns", "http_status", "error_code"]
+JournalRecord = namedtuple("JournalRecord", FIELDS)
+
+# error_code of an attempt that got no HTTP response
+ERROR_CONNECTION = -1
+# error_code of a failed attempt whose response carries no non-zero numeric error code
+ERROR_UNKNOWN = -2
+
+NUMPY_DTYPE = [("timestamp_ns", "<i8"), ("region", "S8"), ("signature", "S64"), ("payload_size", "<u4"),
+               ("serialize_ns", "<i8"), ("request_ns", "<i8"), ("response_ns", "<i8"),
+               ("http_status", "<u2"), ("error_code", "<i4")]
+
+
+def journal_files(prefix):
+    """Journal files of a prefix in rotation order."""
+    return sorted(glob.glob(f"{glob.escape(prefix)}.[0-9][0-9][0-9][0-9][0-9].journal"))
+
+
+def raw_signature(transaction_bytes):
+    """First signature of a serialized transaction, without base58 encoding."""
+    count, offset = read_compact_u16(transaction_bytes, 0)
+    return bytes(transaction_bytes[offset:offset + 64]) if count else b""
+
+
+class Journal:
+    """
+    Append-only, rotating, memory-mapped journal of send attempts.
+
+    Args:
+        prefix (str): Path prefix of the journal files
+        records_per_file (int): Records per file before rotating, each file is preallocated to this size
+        flush_interval (float): Seconds between writes of the queued records to the file
+    """
+
+    def __init__(self, prefix, records_per_file=100000, flush_interval=0.1):
+        self.prefix = prefix
+        self.records_per_file = records_per_file
+        self.flush_interval = flush_interval
+        self._queue = []
+        self._file = None
+        self._map = None
+        self._count = 0
+        existing = journal_files(prefix)
+        self._index = int(existing[-1].rsplit(".", 2)[-2]) + 1 if existing else 0
+        self._flush_task = None
+        # Serializes the worker thread and the final flush in close()
+        self._lock = threading.Lock()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self._flush_and_close, self._take())
+
+    def _flush_and_close(self, queue):
+        with self._lock:
+            self._write(queue)
+            self._close_file()
+
+    def record(self, region, transaction_bytes, serialize_ns, request_ns, response_ns, http_status, error_code):
+        """Queue one send attempt, called on the send path."""
+        self._queue.append((time.time_ns(), region, transaction_bytes, serialize_ns, request_ns, response_ns,
+                            http_status, error_code))
+
+    def _open_file(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.prefix)), exist_ok=True)
+        path = f"{self.prefix}.{self._index:05d}.journal"
+        self._index += 1
+        self._file = open(path, "w+b")
+        self._file.truncate(HEADER.size + self.records_per_file * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._count = 0
+        HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, 0)
+
+    def _close_file(self):
+        if self._map is not None:
+            HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, self._count)
+            self._map.flush()
+            self._map.close()
+            # Cut the unused, preallocated tail
+            self._file.truncate(HEADER.size + self._count * RECORD.size)
+            self._file.close()
+            self._map = self._file = None
+
+    def _take(self):
+        queue, self._queue = self._queue, []
+        return queue
+
+    def flush(self):
+        """Write the queued records to the file, blocking the calling thread."""
+        self._write_locked(self._take())
+
+    def _write_locked(self, queue):
+        with self._lock:
+            self._write(queue)
+
+    def _write(self, queue):
+        for timestamp_ns, region, transaction_bytes, serialize_ns, request_ns, response_ns, http_status, \
+                error_code in queue:
+            if self._map is None or self._count == self.records_per_file:
+                self._close_file()
+                self._open_file()
+            RECORD.pack_into(self._map, HEADER.size + self._count * RECORD.size, timestamp_ns,
+                             region.encode()[:8], raw_signature(transaction_bytes), len(transaction_bytes),
+                             serialize_ns, request_ns, response_ns, http_status, error_code)
+            self._count += 1
+        if queue:
+            # The count in the header marks the records as complete for readers
+            HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, self._count)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # The queue is taken on the loop, packing and rotation run in a worker thread
+                queue = self._take()
+                if queue:
+                    await asyncio.to_thread(self._write_locked, queue)
+            except Exception as e:
+                print("Journal flush failed:", str(e))
+
+
+def _read_header(buffer, path):
+    magic, record_size, count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a journal file")
+    return count
+
+
+def iter_journal(path):
+    """Yields a JournalRecord per record of one journal file, without NumPy."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for index in range(_read_header(buffer, path)):
+            record = JournalRecord(*RECORD.unpack_from(buffer, HEADER.size + index * RECORD.size))
+            yield record._replace(region=record.region.rstrip(b"\0").decode())
+
+
+def read_journal(prefix_or_paths):
+    """
+    Load journal files into one NumPy structured array with the fields of NUMPY_DTYPE.
+
+    Args:
+        prefix_or_paths: Journal prefix, or a list of journal file paths
+
+    Returns:
+        numpy.ndarray: One element per record, in file order
+
+    Raises:
+        ImportError: numpy is not installed, use iter_journal() instead
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("read_journal() needs numpy (pip install numpy), iter_journal() reads without it")
+
+    paths = journal_files(prefix_or_paths) if isinstance(prefix_or_paths, str) else prefix_or_paths
+    dtype = numpy.dtype(NUMPY_DTYPE)
+    arrays = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        count = _read_header(data, path)
+        arrays.append(numpy.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size))
+    return numpy.concatenate(arrays) if arrays else numpy.empty(0, dtype=dtype)
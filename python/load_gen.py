@@ -0,0 +1,177 @@
+import asyncio
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from histogram import Histogram
+from mock_server import MockServer
+from sender import Sender, SendError, REGIONS
+from template import TransactionTemplate
+
+"""
+Open-loop load generator
+
+test_speed.py and test_keepalive.py measure closed-loop: each request waits for the previous one, so
+when the server slows down the client simply sends less, and the queueing delay never shows up in the
+numbers (coordinated omission).
+
+This script sends at a fixed target rate on a schedule instead. Request i is due at start + i / rate and
+is launched on time whether or not earlier requests have completed. Latency is measured from the time
+the request was due, not from when it was actually written, which corrects for coordinated omission.
+The service time (from the actual write) is reported next to it; the difference between the two is the
+queueing delay.
+
+Requests are spread round-robin over every (api-key, region) pair. Each api-key allows 5 calls per
+second, so use it to size how many keys and regions a peak load needs: raise --rate until errors
+(419 by type) or the corrected latency tail grow.
+
+Run it against the local stand-in, or against real endpoints:
+```
+python load_gen.py --mock --api_key a --api_key b --rate 10 --duration 30
+python load_gen.py --api_key KEY1 --api_key KEY2 --url de=http://de1.0slot.trade --rate 10 --output load.json
+```
+The payloads are signed by a throwaway keypair and cannot land, they only exercise the send path.
+"""
+
+
+def build_payloads(count):
+    # Distinct signed transactions, signed up front so signing does not disturb the schedule
+    template = TransactionTemplate.transfer(Keypair(), Pubkey.new_unique(), Pubkey.new_unique())
+    return [template.render(Hash.new_unique()) for _ in range(count)]
+
+
+class LoadGenerator:
+    """
+    Sends at a fixed rate and records coordinated-omission-corrected latencies.
+
+    Args:
+        senders (list): One Sender per api-key
+        regions (list): Regions to spread the requests over
+        rate (float): Target requests per second, in total
+        binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+    """
+
+    def __init__(self, senders, regions, rate, binary=False):
+        self.targets = [(sender, region) for sender in senders for region in regions]
+        self.rate = rate
+        self.binary = binary
+        self.latency = Histogram()
+        self.service_time = Histogram()
+        self.region_latency = defaultdict(Histogram)
+        self.errors = Counter()
+        self.completed = 0
+
+    async def _request(self, index, due, payload):
+        sender, region = self.targets[index % len(self.targets)]
+        started = time.perf_counter_ns()
+        try:
+            if self.binary:
+                await sender.send_binary(payload, region=region)
+            else:
+                await sender.send_transaction(payload, region=region)
+        except SendError as e:
+            self.errors[f"code {e.code}"] += 1
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+        finished = time.perf_counter_ns()
+        self.completed += 1
+        self.latency.record(finished - due)
+        self.service_time.record(finished - started)
+        self.region_latency[region].record(finished - due)
+
+    async def run(self, payloads):
+        """
+        Send every payload on schedule and wait for all responses.
+
+        Returns:
+            float: Seconds from the first due time until the last response
+        """
+        interval_ns = int(1e9 / self.rate)
+        start = time.perf_counter_ns()
+        tasks = []
+        for index, payload in enumerate(payloads):
+            due = start + index * interval_ns
+            delay = due - time.perf_counter_ns()
+            if delay > 0:
+                await asyncio.sleep(delay / 1e9)
+            tasks.append(asyncio.create_task(self._request(index, due, payload)))
+        await asyncio.gather(*tasks)
+        return (time.perf_counter_ns() - start) / 1e9
+
+    def report(self, elapsed):
+        ok = self.completed - sum(self.errors.values())
+        return {
+            "target_rate": self.rate,
+            "elapsed": elapsed,
+            "completed": self.completed,
+            "throughput": self.completed / elapsed if elapsed else 0.0,
+            "accepted_throughput": ok / elapsed if elapsed else 0.0,
+            "errors": dict(self.errors),
+            "latency": self.latency.summary(),
+            "service_time": self.service_time.summary(),
+            "regions": {region: histogram.summary() for region, histogram in self.region_latency.items()},
+        }
+
+
+def print_report(report):
+    print(f"Target rate: {report['target_rate']:.1f}/s, completed {report['completed']} in {report['elapsed']:.2f} seconds")
+    print(f"Throughput: {report['throughput']:.2f}/s, accepted {report['accepted_throughput']:.2f}/s")
+    for error, count in sorted(report["errors"].items()):
+        print(f"  {error}: {count}")
+    rows = [("latency", report["latency"]), ("service", report["service_time"])]
+    rows += [(f"  {region}", summary) for region, summary in sorted(report["regions"].items())]
+    print(f"{'(ms)':<10}{'count':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'max':>9}")
+    for name, summary in rows:
+        if not summary["count"]:
+            continue
+        values = "".join(f"{summary[key] / 1e6:>9.3f}" for key in ["p50", "p90", "p99", "p99.9", "max"])
+        print(f"{name:<10}{summary['count']:>8}{values}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of 0slot.trade senders")
+    parser.add_argument("--api_key", action="append", required=True, help="api-key to spread load over, repeatable.")
+    parser.add_argument("--url", action="append", default=[], metavar="REGION=URL",
+                        help="Region endpoint, repeatable. Defaults to every region in sender.py.")
+    parser.add_argument("--rate", type=float, default=5.0, help="Target requests per second in total.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send for.")
+    parser.add_argument("--connections", type=int, default=8, help="Connections per region and api-key.")
+    parser.add_argument("--binary", action="store_true", help="Send raw bytes to /txb.")
+    parser.add_argument("--mock", action="store_true", help="Send to a local MockServer (see mock_server.py).")
+    parser.add_argument("--latency", type=float, default=0.002, help="MockServer latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.002, help="MockServer jitter in seconds.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    mock = None
+    if args.mock:
+        mock = MockServer(latency=args.latency, jitter=args.jitter)
+        await mock.start()
+        urls = {"mock": mock.url}
+    else:
+        urls = dict(url.split("=", 1) for url in args.url) if args.url else REGIONS
+
+    payloads = build_payloads(int(args.rate * args.duration))
+    senders = [Sender(api_key, regions=list(urls), endpoints=urls, connections_per_region=args.connections)
+               for api_key in args.api_key]
+    try:
+        await asyncio.gather(*(sender.start() for sender in senders))
+        generator = LoadGenerator(senders, list(urls), args.rate, args.binary)
+        elapsed = await generator.run(payloads)
+    finally:
+        for sender in senders:
+            await sender.close()
+        if mock is not None:
+            await mock.close()
+
+    report = generator.report(elapsed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
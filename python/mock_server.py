@@ -0,0 +1,205 @@
+import asyncio
+import argparse
+import base64
+import json
+import random
+import time
+from collections import defaultdict, deque
+import base58
+from aiohttp import web
+from template import read_compact_u16
+
+"""
+Local stand-in for a 0slot.trade node
+
+Speaks both submission protocols without spending SOL or rate limit:
+- POST /?api-key=...     JSON-RPC sendTransaction with a base64 transaction (main.py)
+- POST /txb?api-key=...  raw transaction bytes (post_binary.py)
+- GET, or any request without the api-key, answers "ok" and does not count toward TPS (heartbeat)
+
+Like the real node it allows 5 calls per second per api-key and answers with the error bodies from
+the README: 403 "API key has expired", 403 "Invalid method" and 419 "Rate limit exceeded". JSON-RPC
+errors are returned with HTTP status 200, /txb errors with the error code as HTTP status. Idle Keep-Alive
+connections are closed after 65 seconds. A latency and a random jitter can be added to every response.
+
+The result of an accepted transaction is its first signature, so the client can match it.
+
+Run it standalone:
+```
+python mock_server.py --port 8899 --latency 0.002 --jitter 0.001 --expired_key old-key
+python test_speed.py --url local=http://127.0.0.1:8899
+```
+or in-process:
+```
+async with MockServer(port=8899) as server:
+    sender = Sender("test", regions=["de"], endpoints={"de": server.url})
+```
+"""
+
+KEEPALIVE_TIMEOUT = 65
+
+
+def error_body(request_id, code, message):
+    return {"id": request_id, "jsonrpc": "2.0", "error": {"code": code, "message": message}}
+
+
+def first_signature(transaction_bytes):
+    """Base58 signature of a serialized transaction, None if it is malformed."""
+    try:
+        count, offset = read_compact_u16(transaction_bytes, 0)
+    except IndexError:
+        return None
+    if count < 1 or len(transaction_bytes) < offset + 64:
+        return None
+    return base58.b58encode(transaction_bytes[offset:offset + 64]).decode()
+
+
+class MockServer:
+    """
+    Local 0slot.trade node.
+
+    Args:
+        host (str): Address to listen on
+        port (int): Port to listen on, 0 picks a free one
+        rate (int): Calls per second allowed per api-key
+        expired_keys (list): api-keys answered with "API key has expired"
+        latency (float): Seconds added to every response
+        jitter (float): Maximum random seconds added on top of latency
+        keepalive_timeout (float): Seconds an idle connection is kept open
+
+    Attributes:
+        stats (dict): Number of responses by outcome ("accepted", "rate_limited", "expired", ...)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rate=5, expired_keys=(), latency=0.0, jitter=0.0,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.expired_keys = set(expired_keys)
+        self.latency = latency
+        self.jitter = jitter
+        self.keepalive_timeout = keepalive_timeout
+        self.stats = defaultdict(int)
+        self._calls = defaultdict(deque)
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/txb", self.handle_binary)
+        self.app.router.add_route("*", "/", self.handle_rpc)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, keepalive_timeout=self.keepalive_timeout)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # Resolve the port picked by the OS when port=0
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _check_key(self, api_key):
+        """Returns (code, message) of the error for this call, None if it is allowed."""
+        if api_key in self.expired_keys:
+            self.stats["expired"] += 1
+            return 403, "API key has expired"
+        now = time.monotonic()
+        calls = self._calls[api_key]
+        while calls and now - calls[0] >= 1.0:
+            calls.popleft()
+        if len(calls) >= self.rate:
+            self.stats["rate_limited"] += 1
+            return 419, "Rate limit exceeded"
+        calls.append(now)
+        return None
+
+    async def handle_rpc(self, request):
+        await self._delay()
+        api_key = request.query.get("api-key")
+        if request.method != "POST" or not api_key:
+            # Keep-Alive access, does not count toward TPS
+            self.stats["health"] += 1
+            return web.Response(text="ok")
+        try:
+            body = json.loads(await request.read())
+        except ValueError:
+            self.stats["invalid"] += 1
+            return web.json_response(error_body(None, -32700, "Parse error"))
+        if not isinstance(body, dict):
+            # e.g. a batch array or a bare value
+            self.stats["invalid"] += 1
+            return web.json_response(error_body(None, -32600, "Invalid request"))
+        request_id = body.get("id")
+        if body.get("method") != "sendTransaction":
+            self.stats["invalid_method"] += 1
+            return web.json_response(error_body(request_id, 403, "Invalid method"))
+        error = self._check_key(api_key)
+        if error is not None:
+            return web.json_response(error_body(request_id, *error))
+        try:
+            signature = first_signature(base64.b64decode(body["params"][0]))
+        except (KeyError, IndexError, TypeError, ValueError):
+            signature = None
+        if signature is None:
+            self.stats["invalid"] += 1
+            return web.json_response(error_body(request_id, -32602, "Invalid transaction"))
+        self.stats["accepted"] += 1
+        return web.json_response({"jsonrpc": "2.0", "id": request_id, "result": signature})
+
+    async def handle_binary(self, request):
+        await self._delay()
+        api_key = request.query.get("api-key")
+        transaction_bytes = await request.read()
+        if not api_key:
+            self.stats["health"] += 1
+            return web.Response(text="ok")
+        error = self._check_key(api_key)
+        if error is not None:
+            return web.json_response(error_body("1", *error), status=error[0])
+        signature = first_signature(transaction_bytes)
+        if signature is None:
+            self.stats["invalid"] += 1
+            return web.json_response(error_body("1", 400, "Invalid transaction"), status=400)
+        self.stats["accepted"] += 1
+        return web.json_response({"jsonrpc": "2.0", "id": "1", "result": signature})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a local 0slot.trade stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8899, help="Port to listen on.")
+    parser.add_argument("--rate", type=int, default=5, help="Calls per second allowed per api-key.")
+    parser.add_argument("--expired_key", action="append", default=[], help="api-key answered as expired.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum random seconds added on top.")
+    args = parser.parse_args()
+
+    server = MockServer(args.host, args.port, args.rate, args.expired_key, args.latency, args.jitter)
+    await server.start()
+    print(f"Listening on {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        print(dict(server.stats))
+
+if __name__ == "__main__":
+    asyncio.run(main())
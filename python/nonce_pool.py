@@ -0,0 +1,223 @@
+import asyncio
+import struct
+import time
+from solders.hash import Hash
+from solders.pubkey import Pubkey
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+
+"""
+Durable nonce account pool
+
+Reading the nonce account with get_account_info before every send costs an RPC round-trip and
+serializes all sends on one nonce. NoncePool holds many nonce accounts, keeps the current nonce value
+of each one cached, and hands out an idle account immediately.
+
+An account is busy from acquire() until the nonce advance made by the transaction using it has been
+observed. The pool refreshes busy accounts in the background with one getMultipleAccounts call, and the
+account becomes idle again with its new nonce value. If a sent transaction never lands, the account is
+released with its old nonce after advance_timeout; any late landing of the old transaction and the
+next one using the same nonce are still mutually exclusive.
+
+Usage:
+```
+async with NoncePool(nonce_pubkeys) as pool:
+    account = await pool.acquire()
+    ... build with account.pubkey / account.nonce, send ...
+    pool.release(account, sent=True)
+```
+"""
+
+# The nonce account data layout matches the Rust NonceState structure:
+# struct NonceState {
+#     version: u32,          // 4 bytes (offset 0-3)
+#     state: u32,            // 4 bytes (offset 4-7)
+#     authorized_pubkey: Pubkey,  // 32 bytes (offset 8-39)
+#     nonce: Pubkey,         // 32 bytes (offset 40-71)
+#     fee_calculator: FeeCalculator,  // 8 bytes (offset 72-79)
+# }
+NONCE_ACCOUNT_LENGTH = 80
+STATE_INITIALIZED = 1
+AUTHORITY_OFFSET = 8
+NONCE_OFFSET = 40
+
+# getMultipleAccounts accepts at most 100 accounts per call
+MAX_ACCOUNTS_PER_CALL = 100
+
+
+def parse_nonce_account(data):
+    """
+    Parses nonce account data without copying it.
+
+    Args:
+        data: Account data (bytes, bytearray or memoryview)
+
+    Returns:
+        tuple: (authority Pubkey, nonce memoryview of 32 bytes)
+    """
+    view = memoryview(data)
+    if len(view) < NONCE_ACCOUNT_LENGTH:
+        raise ValueError(f"Nonce account data is {len(view)} bytes, expected {NONCE_ACCOUNT_LENGTH}")
+    if struct.unpack_from("<I", view, 4)[0] != STATE_INITIALIZED:
+        raise ValueError("Nonce account is not initialized")
+    authority = Pubkey.from_bytes(bytes(view[AUTHORITY_OFFSET:NONCE_OFFSET]))
+    return authority, view[NONCE_OFFSET:NONCE_OFFSET + 32]
+
+
+class NonceAccount:
+    """
+    Cached state of one nonce account.
+
+    Attributes:
+        pubkey (Pubkey): Nonce account address
+        authority (Pubkey): Nonce authority
+        nonce (Hash): Current nonce value, used as the blockhash of the transaction
+        busy (bool): Handed out, or waiting for its nonce advance to be observed
+        sent_at (float): time.monotonic() of the release of a sent transaction, None otherwise
+    """
+
+    def __init__(self, pubkey):
+        self.pubkey = pubkey
+        self.authority = None
+        self.nonce = None
+        self.nonce_bytes = None
+        self.busy = False
+        self.sent_at = None
+
+    def update(self, data):
+        """Update from account data, returns True if the nonce value changed."""
+        authority, nonce = parse_nonce_account(data)
+        if self.nonce_bytes is not None and nonce == self.nonce_bytes:
+            return False
+        self.authority = authority
+        self.nonce_bytes = bytes(nonce)
+        self.nonce = Hash.from_bytes(self.nonce_bytes)
+        return True
+
+
+class NoncePool:
+    """
+    Pool of durable nonce accounts with cached nonce values.
+
+    Args:
+        nonce_pubkeys (list): Nonce account addresses (Pubkey or base58 strings)
+        rpc_url (str): RPC endpoint used for getMultipleAccounts
+        poll_interval (float): Seconds between refreshes of accounts waiting for their advance
+        advance_timeout (float): Seconds after which a sent account is released with its old nonce
+        commitment: Commitment of the account reads
+    """
+
+    def __init__(self, nonce_pubkeys, rpc_url="https://api.mainnet-beta.solana.com", poll_interval=0.5,
+                 advance_timeout=60, commitment=Confirmed):
+        self.accounts = [NonceAccount(Pubkey.from_string(pubkey) if isinstance(pubkey, str) else pubkey)
+                         for pubkey in nonce_pubkeys]
+        self.client = AsyncClient(rpc_url, commitment=commitment)
+        self.poll_interval = poll_interval
+        self.advance_timeout = advance_timeout
+        self._available = asyncio.Condition()
+        self._poll_task = None
+        self._notifies = set()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Read every nonce account once and start refreshing in the background."""
+        await self.refresh(self.accounts)
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        await self.client.close()
+
+    async def refresh(self, accounts):
+        """
+        Read `accounts` with getMultipleAccounts and update their cached nonces.
+
+        Returns:
+            list: Accounts whose nonce value changed
+        """
+        changed = []
+        for start in range(0, len(accounts), MAX_ACCOUNTS_PER_CALL):
+            batch = accounts[start:start + MAX_ACCOUNTS_PER_CALL]
+            response = await self.client.get_multiple_accounts([account.pubkey for account in batch])
+            for account, info in zip(batch, response.value):
+                if info is None:
+                    print(f"Nonce account {account.pubkey} not found")
+                    continue
+                if account.update(info.data):
+                    changed.append(account)
+        return changed
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            waiting = [account for account in self.accounts if account.sent_at is not None]
+            if not waiting:
+                continue
+            try:
+                advanced = await self.refresh(waiting)
+            except Exception as e:
+                print("Nonce refresh failed:", str(e))
+                advanced = []
+            now = time.monotonic()
+            released = [account for account in waiting
+                        if account in advanced or now - account.sent_at > self.advance_timeout]
+            if released:
+                async with self._available:
+                    for account in released:
+                        account.busy = False
+                        account.sent_at = None
+                    self._available.notify(len(released))
+
+    def idle(self):
+        """Number of accounts that can be acquired right now."""
+        return sum(1 for account in self.accounts if not account.busy and account.nonce is not None)
+
+    async def acquire(self):
+        """
+        Wait for an idle nonce account and mark it busy.
+
+        Returns:
+            NonceAccount: Account with its cached nonce value
+        """
+        async with self._available:
+            while True:
+                for account in self.accounts:
+                    if not account.busy and account.nonce is not None:
+                        account.busy = True
+                        return account
+                await self._available.wait()
+
+    def release(self, account, sent=True):
+        """
+        Give an acquired account back.
+
+        Args:
+            account (NonceAccount): Account returned by acquire()
+            sent (bool): A transaction using the nonce was sent. The account stays busy until the nonce
+                advance is observed. Pass False if nothing was sent, the account is idle again at once.
+        """
+        if sent:
+            account.sent_at = time.monotonic()
+            return
+        account.busy = False
+        # The loop only keeps weak references to tasks
+        task = asyncio.create_task(self._notify())
+        self._notifies.add(task)
+        task.add_done_callback(self._notifies.discard)
+
+    async def _notify(self):
+        async with self._available:
+            self._available.notify()
@@ -0,0 +1,295 @@
+import asyncio
+from collections import defaultdict, namedtuple
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.message import Message
+from solders.system_program import TransferParams, transfer
+from solders.sysvar import RECENT_BLOCKHASHES
+from sender import PACKET_DATA_SIZE
+from signer import with_blockhash
+from tips import MIN_TIP_LAMPORTS, RoundRobin, tip_instruction
+
+"""
+Intent packer
+
+0slot.trade allows 5 sendTransaction calls per second per api-key and every call carries a tip of at
+least 0.001 SOL, yet main.py spends a whole call and a whole tip on a single 1-lamport transfer.
+IntentPacker queues transfer intents per payer for `window` seconds and packs as many of them as fit
+into one legacy transaction of at most 1232 bytes (PACKET_DATA_SIZE), with a single tip instruction:
+
+    transaction  = 65 bytes (one signature) + message
+    every intent = 17 bytes of instruction + 32 bytes for a new receiver account
+
+so about 20 transfers share one call and one tip instead of 20 calls and 20 tips.
+
+Intents are packed in arrival order, first fit. Two intents are kept in separate transactions when
+- they conflict: they write a common account besides the payer (by default the receiver), so an intent
+  never succeeds or fails together with another one touching the same account
+- they carry a durable nonce: one transaction advances one nonce, and intents using the same nonce are
+  alternatives of which at most one may execute, so every nonce intent is sent in its own transaction
+
+Every intent's future resolves with the result of the send carrying it (the signature), or fails with
+its exception.
+
+Usage:
+```
+packer = IntentPacker(client_for_send.send_transaction, client_for_blockhash, signers, window=0.05)
+signatures = await asyncio.gather(*(packer.submit(payer, receiver, lamports) for receiver in receivers))
+await packer.close()
+```
+"""
+
+# Compute units of a system program instruction (transfer, advance nonce) and of a compute budget instruction
+SYSTEM_UNITS = 150
+COMPUTE_BUDGET_UNITS = 150
+
+# Bytes of one signature, of the message header and of the recent blockhash
+SIGNATURE_BYTES = 64
+HEADER_BYTES = 3
+BLOCKHASH_BYTES = 32
+# Compiled advance nonce instruction: program index, 3 account indexes, 4 bytes of data
+ADVANCE_NONCE_BYTES = 1 + 1 + 3 + 1 + 4
+
+TransferIntent = namedtuple("TransferIntent", ["payer", "receiver", "lamports", "nonce", "accounts", "future"])
+
+
+def compact_u16_size(value):
+    """Bytes of a compact-u16 (shortvec) length."""
+    return 1 if value < 0x80 else 2 if value < 0x4000 else 3
+
+
+def instruction_size(instruction):
+    """Bytes of a compiled instruction: program index, account indexes and data with their lengths."""
+    return (1 + compact_u16_size(len(instruction.accounts)) + len(instruction.accounts)
+            + compact_u16_size(len(instruction.data)) + len(instruction.data))
+
+
+class PackedTransaction:
+    """
+    Instructions of one transaction under construction, with its exact serialized size.
+
+    Args:
+        payer (Pubkey): Fee payer, the only signer unless a nonce authority is another account
+        tip (Instruction): Tip transfer of the transaction
+        compute_unit_price (int): Micro-lamports per compute unit, None for no compute budget instructions
+
+    Attributes:
+        nonce (NonceAccount): Durable nonce of the transaction's intent, None to use the recent blockhash
+    """
+
+    def __init__(self, payer, tip, compute_unit_price=None):
+        self.payer = payer
+        self.tip = tip
+        self.compute_unit_price = compute_unit_price
+        self.nonce = None
+        self.intents = []
+        self.transfers = []
+        self.keys = {payer}
+        self.written = set()
+        self.instruction_bytes = 0
+        self._add_instruction(tip)
+        for instruction in self._budget_instructions():
+            self._add_instruction(instruction)
+
+    def _budget_instructions(self):
+        if self.compute_unit_price is None:
+            return []
+        # The transfers, the tip and the nonce advance
+        units = (len(self.transfers) + 1 + (self.nonce is not None)) * SYSTEM_UNITS + 2 * COMPUTE_BUDGET_UNITS
+        return [set_compute_unit_limit(units), set_compute_unit_price(self.compute_unit_price)]
+
+    def _add_instruction(self, instruction):
+        self.keys.add(instruction.program_id)
+        self.keys.update(meta.pubkey for meta in instruction.accounts)
+        self.instruction_bytes += instruction_size(instruction)
+
+    def size(self, extra_keys=0, extra_instructions=0, extra_bytes=0, extra_signatures=0):
+        """Serialized transaction size in bytes, optionally with an instruction more."""
+        keys = len(self.keys) + extra_keys
+        instructions = (len(self.transfers) + 1 + (self.compute_unit_price is not None) * 2
+                        + (self.nonce is not None) + extra_instructions)
+        signatures = 1 + (self.nonce is not None and self.nonce.authority != self.payer) + extra_signatures
+        return (compact_u16_size(signatures) + SIGNATURE_BYTES * signatures + HEADER_BYTES
+                + compact_u16_size(keys) + 32 * keys + BLOCKHASH_BYTES
+                + compact_u16_size(instructions) + self.instruction_bytes + extra_bytes)
+
+    def add(self, intent, instruction):
+        """
+        Add an intent if it fits and does not conflict. An intent with a nonce only goes into an empty transaction.
+
+        Returns:
+            bool: True if it was added
+        """
+        if self.nonce is not None or (intent.nonce is not None and self.intents) \
+                or not self.written.isdisjoint(intent.accounts):
+            return False
+        new_keys = {meta.pubkey for meta in instruction.accounts} | {instruction.program_id}
+        extra_keys, extra_instructions, extra_bytes = len(new_keys - self.keys), 1, instruction_size(instruction)
+        extra_signatures = 0
+        if intent.nonce is not None:
+            # The advance nonce instruction Message.new_with_nonce puts first: nonce account, sysvar, authority
+            nonce_keys = {intent.nonce.pubkey, RECENT_BLOCKHASHES, intent.nonce.authority}
+            extra_keys += len(nonce_keys - self.keys - new_keys)
+            extra_instructions += 1
+            extra_bytes += ADVANCE_NONCE_BYTES
+            extra_signatures = intent.nonce.authority != self.payer
+        if self.size(extra_keys, extra_instructions, extra_bytes, extra_signatures) > PACKET_DATA_SIZE:
+            return False
+        if intent.nonce is not None:
+            self.nonce = intent.nonce
+            self.keys.update(nonce_keys)
+            self.instruction_bytes += ADVANCE_NONCE_BYTES
+        self.intents.append(intent)
+        self.transfers.append(instruction)
+        self.written.update(intent.accounts)
+        self._add_instruction(instruction)
+        return True
+
+    def message(self, blockhash=None):
+        """
+        Message with the compute budget instructions, the transfers and the tip, in that order.
+
+        Args:
+            blockhash (Hash): Recent blockhash, not used with a nonce
+        """
+        instructions = self._budget_instructions() + self.transfers + [self.tip]
+        if self.nonce is not None:
+            message = Message.new_with_nonce(instructions, self.payer, self.nonce.pubkey, self.nonce.authority)
+            # new_with_nonce leaves the blockhash empty, the nonce value takes its place
+            return with_blockhash(message, self.nonce.nonce)
+        return Message.new_with_blockhash(instructions, self.payer, blockhash)
+
+
+class IntentPacker:
+    """
+    Coalesces transfer intents of the same payer into as few transactions as fit.
+
+    Args:
+        send: Coroutine function sending a signed transaction, e.g. Sender.send_transaction or TxbTransport.send
+        blockhash_cache (BlockhashCache): Started cache providing the recent blockhash, see blockhash.py
+        signers (SignerRegistry): Registry holding the keypairs of every payer, see signer.py
+        window (float): Seconds the first intent of a payer waits for more to join it
+        max_intents (int): Queued intents of a payer that flush before the window ends
+        tip_lamports (int): Tip per transaction, at least 0.001 SOL
+        tip_policy: Rotation policy from tips.py choosing the tip account of every transaction
+        fee_oracle (FeeOracle): Optional, adds a compute unit limit for the packed transfers and its current
+            compute unit price, see fees.py
+
+    Attributes:
+        transactions (int): Transactions sent
+        intents (int): Intents sent
+    """
+
+    def __init__(self, send, blockhash_cache, signers, window=0.05, max_intents=64, tip_lamports=MIN_TIP_LAMPORTS,
+                 tip_policy=None, fee_oracle=None):
+        self.send = send
+        self.blockhash_cache = blockhash_cache
+        self.signers = signers
+        self.window = window
+        self.max_intents = max_intents
+        self.tip_lamports = tip_lamports
+        self.tip_policy = tip_policy or RoundRobin()
+        self.fee_oracle = fee_oracle
+        self.transactions = 0
+        self.intents = 0
+        self._queues = defaultdict(list)
+        self._timers = {}
+        self._flushes = set()
+
+    def submit(self, payer, receiver, lamports, nonce=None, accounts=None):
+        """
+        Queue a transfer.
+
+        Args:
+            payer (Pubkey): Sender of the lamports, its keypair must be in the registry
+            receiver (Pubkey): Receiver of the lamports
+            lamports (int): Amount
+            nonce (NonceAccount): Durable nonce for this intent, acquired from a NoncePool; the intent is then
+                sent in a transaction of its own, signed by the payer and the nonce authority
+            accounts (set): Writable accounts besides the payer that conflict with other intents, defaults
+                to the receiver
+
+        Returns:
+            asyncio.Future: Resolves with the result of the send carrying the intent
+
+        Raises:
+            ValueError: The nonce account is not loaded yet or the registry has no keypair of its authority
+        """
+        if nonce is not None:
+            if nonce.authority is None or nonce.nonce is None:
+                raise ValueError(f"Nonce account {nonce.pubkey} has not been read yet")
+            if nonce.authority not in self.signers:
+                raise ValueError(f"No keypair registered for the nonce authority {nonce.authority} of {nonce.pubkey}")
+        loop = asyncio.get_running_loop()
+        intent = TransferIntent(payer, receiver, lamports, nonce,
+                                frozenset(accounts if accounts is not None else [receiver]), loop.create_future())
+        queue = self._queues[payer]
+        queue.append(intent)
+        if len(queue) >= self.max_intents:
+            self.flush(payer)
+        elif payer not in self._timers:
+            self._timers[payer] = loop.call_later(self.window, self.flush, payer)
+        return intent.future
+
+    def flush(self, payer):
+        """Pack and send the queued intents of a payer now."""
+        timer = self._timers.pop(payer, None)
+        if timer is not None:
+            timer.cancel()
+        intents = self._queues.pop(payer, [])
+        if not intents:
+            return
+        task = asyncio.create_task(self._send_packed(payer, intents))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def close(self):
+        """Send everything still queued and wait for it."""
+        for payer in list(self._queues):
+            self.flush(payer)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def pack(self, payer, intents):
+        """
+        Pack intents of one payer, first fit in arrival order.
+
+        Returns:
+            list: PackedTransaction per transaction to send
+        """
+        compute_unit_price = self.fee_oracle.price if self.fee_oracle is not None else None
+        packed = []
+        for intent in intents:
+            instruction = transfer(TransferParams(from_pubkey=payer, to_pubkey=intent.receiver, lamports=intent.lamports))
+            if intent.nonce is None and any(transaction.add(intent, instruction) for transaction in packed):
+                continue
+            transaction = PackedTransaction(payer, tip_instruction(payer, self.tip_policy.choose(), self.tip_lamports),
+                                            compute_unit_price)
+            if not transaction.add(intent, instruction):
+                raise ValueError(f"Transfer to {intent.receiver} does not fit into a transaction")
+            packed.append(transaction)
+        return packed
+
+    async def _send_packed(self, payer, intents):
+        try:
+            packed = self.pack(payer, intents)
+            blockhash = None
+            if any(transaction.nonce is None for transaction in packed):
+                blockhash = self.blockhash_cache.get().blockhash
+            messages = [transaction.message(blockhash) for transaction in packed]
+            signed = await self.signers.sign_batch(messages)
+        except Exception as e:
+            for intent in intents:
+                if not intent.future.done():
+                    intent.future.set_exception(e)
+            return
+        results = await asyncio.gather(*(self.send(transaction) for transaction in signed), return_exceptions=True)
+        for transaction, result in zip(packed, results):
+            self.transactions += 1
+            self.intents += len(transaction.intents)
+            for intent in transaction.intents:
+                if intent.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    intent.future.set_exception(result)
+                else:
+                    intent.future.set_result(result)
@@ -1,29 +1,59 @@
 import asyncio
 import argparse
-from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 from solders.transaction import Transaction
 from solders.message import Message
 from solders.system_program import TransferParams, transfer
-from solana.rpc.async_api import AsyncClient
-import aiohttp
-import base58
+from blockhash import BlockhashCache
+from fees import FeeOracle, FeePolicy, LandingEfficiency
+from confirmations import ConfirmationTracker, ExpiredError
+from txb import TxbTransport
+from signer import SignerRegistry
+from tips import MIN_TIP_LAMPORTS, RoundRobin, tip_instruction, tip_pubkey
+from instrumentation import Instrumentation
 import base64
 
-async def send_solana_transaction(api_key, private_key, tip_key, to_public_key):
+# Rotates the tip account between transactions (see tips.py).
+TIP_POLICY = RoundRobin()
+# Keypairs decoded once per process.
+SIGNERS = SignerRegistry()
+# Landings per lamport spent on tips and priority fees (see fees.py).
+EFFICIENCY = LandingEfficiency()
+
+async def send_solana_transaction(api_key, private_key, tip_key, to_public_key, instrumentation, fee_policy=None,
+                                  confirm=False):
     # Create two separate clients: one for fetching the latest blockhash and another for sending the transaction.
-    client_for_blockhash = AsyncClient(f"https://api.mainnet-beta.solana.com")
+    # The blockhash cache polls in the background, builders read it without an RPC round-trip (see blockhash.py).
+    client_for_blockhash = BlockhashCache()
+    # The /txb transport keeps persistent pipelined connections open, prioritize the endpoints provided by the sales team (see txb.py).
+    client_for_send = TxbTransport(api_key, region="de", instrumentation=instrumentation)
+    # Without --tip_key the tip account rotates over every account in tips.py.
+    tip_receiver = tip_pubkey(tip_key) if tip_key else TIP_POLICY.choose()
+    # Recent prioritization fees of every account the transaction writes: the payer, the receiver and the tip
+    # account, turned into cached compute budget instructions (see fees.py).
+    # The payer's keypair is decoded here once, the send path below reuses it from the registry.
+    payer = SIGNERS.load(private_key).pubkey()
+    fee_oracle = FeeOracle(accounts=[payer, to_public_key, tip_receiver], policy=fee_policy)
 
-    # Fetch the latest blockhash from the Solana network.
-    latest_blockhash = await client_for_blockhash.get_latest_blockhash()
-    await client_for_blockhash.close()  # Close the blockhash client after fetching the data.
+    # Fetch the latest blockhash and the recent fees from the Solana network while the send connection is being opened.
+    # Each of the concurrent steps is timed as its own phase (see instrumentation.py).
+    await asyncio.gather(
+        instrumentation.timed("blockhash_fetch", client_for_blockhash.start()),
+        instrumentation.timed("connection_open", client_for_send.start()),
+        instrumentation.timed("fee_fetch", fee_oracle.start()),
+    )
+    latest_blockhash = client_for_blockhash.get()
+    # Time every following phase of the send path.
+    stopwatch = instrumentation.stopwatch()
+    await client_for_blockhash.close()  # A one-shot script does not need to keep polling.
+    await fee_oracle.close()
 
-    # Decode the sender's private key from a base58-encoded string and create a Keypair object.
-    sender = Keypair.from_bytes(base58.b58decode(private_key))
+    # The keypair was decoded from its base58 private key once, later sends reuse the Keypair (see signer.py).
+    sender = SIGNERS.load(private_key)
+    stopwatch.lap("keypair_load")
 
-    # Create Pubkey objects for the receiver and the tip receiver.
+    # Create the Pubkey object for the receiver.
     receiver = Pubkey.from_string(to_public_key)
-    tip_receiver = Pubkey.from_string(tip_key)
 
     # Create transfer instructions for the main transfer and the tip transfer.
     main_transfer_instruction = transfer(
@@ -33,75 +63,83 @@ async def send_solana_transaction(api_key, private_key, tip_key, to_public_key):
             lamports=1                    # Amount to transfer (1 lamports).
         )
     )
-    # You need to transfer an amount greater than or equal to 0.001 SOL to any of the following accounts:
-    # 4HiwLEP2Bzqj3hM2ENxJuzhcPCdsafwiet3oGkMkuQY4
-    # 7toBU3inhmrARGngC7z6SjyP85HgGMmCTEwGNRAcYnEK
-    # 8mR3wB1nh4D6J9RUCugxUpc6ya8w38LPxZ3ZjcBhgzws
-    # 6SiVU5WEwqfFapRuYCndomztEwDjvS5xgtEof3PLEGm9
-    # TpdxgNJBWZRL8UXF5mrEsyWxDWx9HQexA9P1eTWQ42p
-    # D8f3WkQu6dCF33cZxuAsrKHrGsqGP2yvAHf8mX6RXnwf
-    # GQPFicsy3P3NXxB5piJohoxACqTvWE9fKpLgdsMduoHE
-    # Ey2JEr8hDkgN8qKJGrLf2yFjRhW7rab99HVxwi5rcvJE
-    # 4iUgjMT8q2hNZnLuhpqZ1QtiV8deFPy2ajvvjEpKKgsS
-    # 3Rz8uD83QsU8wKvZbgWAPvCNDU6Fy8TSZTMcPm3RB6zt
-    tip_transfer_instruction = transfer(
-        TransferParams(
-            from_pubkey=sender.pubkey(),  # Sender's public key.
-            to_pubkey=tip_receiver,       # Tip receiver's public key.
-            lamports=1000000               # Amount to transfer as a tip (0.001 SOL in this case).
-        )
-    )
+    # You need to transfer an amount greater than or equal to 0.001 SOL to any of the tip accounts in tips.py.
+    # The tip instruction is cached per (payer, tip account, lamports).
+    tip_transfer_instruction = tip_instruction(sender.pubkey(), tip_receiver, MIN_TIP_LAMPORTS)
+
+    # Set the compute unit limit and price first, the instructions are precomputed by the fee oracle.
+    compute_budget_instructions = fee_oracle.instructions()
 
     # Create a message containing the instructions.
     # The message is required to construct the transaction.
     message = Message.new_with_blockhash(
-        [main_transfer_instruction, tip_transfer_instruction],  # List of instructions.
+        [*compute_budget_instructions, main_transfer_instruction, tip_transfer_instruction],  # List of instructions.
         payer=sender.pubkey(),                                  # Payer's public key.
-        blockhash=latest_blockhash.value.blockhash              # Recent blockhash.
+        blockhash=latest_blockhash.blockhash                    # Recent blockhash.
     )
+    stopwatch.lap("instruction_build")
 
     # Create a transaction using the message and the sender's keypair.
     transaction = Transaction.new_unsigned(message)
 
     # Sign the transaction with the sender's keypair.
-    transaction.sign([sender], latest_blockhash.value.blockhash)
+    transaction.sign([sender], latest_blockhash.blockhash)
+    stopwatch.lap("sign")
 
     # Send the transaction to the Solana network.
+    sent = False
     try:
         transaction_bytes = bytes(transaction)
         # transaction_base64 = base64.b64encode(transaction_bytes).decode('utf-8')
-        async with aiohttp.ClientSession() as session:
-            # prioritize using the ones provided by the sales team, as HTTP is more efficient than HTTPS
-            async with session.post(f"https://de.0slot.trade/txb?api-key={api_key}",
-                data=transaction_bytes,
-            ) as response:
-                if response.status == 200:
-                    result = await response.text()
-                    print("res:", result)
-                else:
-                    error_text = await response.text()
-                    print(f"Error: HTTP {response.status} - {error_text}")
+        result = await client_for_send.send(transaction_bytes)
+        print("res:", result)
+        sent = True
     except Exception as e:
         print("Error:", str(e))
+    await client_for_send.close()  # Close the send client after the transaction is complete.
+
+    # Optionally wait for the landing and record it with the tip and the priority fee paid.
+    if confirm and sent:
+        async with ConfirmationTracker() as tracker:
+            try:
+                await tracker.track(transaction.signatures[0], latest_blockhash.last_valid_block_height)
+                landed = True
+            except ExpiredError:
+                landed = False
+        EFFICIENCY.record(MIN_TIP_LAMPORTS, fee_oracle.priority_fee_lamports(), landed)
+        print("Landed:", landed, EFFICIENCY.summary())
 
 async def main():
     # Set up command-line argument parsing to accept required inputs.
     parser = argparse.ArgumentParser(description="Send a Solana transaction")
     parser.add_argument("--api_key", required=True, help="Solana API key for accessing the network.")
     parser.add_argument("--private_key", required=True, help="Sender's private key for signing the transaction.")
-    parser.add_argument("--tip_key", required=True, help="Public key of the tip receiver.")
+    parser.add_argument("--tip_key", help="Public key of the tip receiver, defaults to a rotating tip account.")
     parser.add_argument("--to_public_key", required=True, help="Public key of the main receiver.")
+    parser.add_argument("--fee_percentile", type=float, default=75,
+                        help="Percentile of the recent prioritization fees to pay.")
+    parser.add_argument("--max_priority_fee", type=int, default=1000000,
+                        help="Cap of the compute unit price in micro-lamports.")
+    parser.add_argument("--confirm", action="store_true",
+                        help="Wait until the transaction lands or expires and print the landing efficiency.")
+    parser.add_argument("--metrics", action="store_true", help="Print the timing of every phase in Prometheus text format.")
 
     # Parse the command-line arguments.
     args = parser.parse_args()
 
     # Call the `send_solana_transaction` function with the provided arguments.
+    instrumentation = Instrumentation()
     await send_solana_transaction(
         args.api_key,
         args.private_key,
         args.tip_key,
         args.to_public_key,
+        instrumentation,
+        FeePolicy(args.fee_percentile, max_price=args.max_priority_fee),
+        args.confirm,
     )
+    if args.metrics:
+        print(instrumentation.prometheus())
 
 if __name__ == "__main__":
     # Run the `main` function asynchronously using asyncio.
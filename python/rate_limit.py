@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+"""
+Client-side rate limiter for staked_conn sendTransaction
+
+0slot.trade allows a maximum of 5 calls per second per api-key and answers any call above that with
+{"error":{"code":419,"message":"Rate limit exceeded"}}. A burst without throttling simply burns
+requests on 419s.
+
+RateLimiter keeps one token bucket per api-key in front of the Sender. Callers wait in a priority
+queue, so an urgent transaction takes the next free slot ahead of low-value ones. When a 419 still
+comes back (another process using the same key, clock skew with the server's window) the bucket
+drains, pauses for a full second and lowers its rate, then recovers step by step on every success.
+
+The default bucket capacity of 1 spaces calls 200ms apart, which can never exceed 5 calls in any
+one-second window. A larger capacity allows bursts but may exceed the server's window.
+"""
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Documented limit of staked_conn sendTransaction
+MAX_TPS = 5
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum number of tokens, i.e. the allowed burst
+    """
+
+    def __init__(self, rate=MAX_TPS, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available, 0 if one is available now."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now, seconds):
+        """Drop all tokens and hand out none for `seconds`."""
+        self._refill(now)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.updated = self.paused_until
+
+
+class _KeyState:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.waiters = []
+        self.dispatcher = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class RateLimiter:
+    """
+    Per-api-key token buckets with a priority queue of waiting senders.
+
+    Args:
+        rate (float): Calls per second allowed per api-key
+        capacity (float): Bucket capacity (burst size)
+        min_rate (float): Lowest rate the adaptive backoff goes down to
+        decrease (float): Factor applied to the rate on every 419
+        increase (float): Calls per second added back on every success
+        penalty (float): Seconds without any call after a 419
+    """
+
+    def __init__(self, rate=MAX_TPS, capacity=1, min_rate=1, decrease=0.8, increase=0.1, penalty=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.penalty = penalty
+        self._keys = {}
+        self._sequence = itertools.count()
+
+    def _state(self, api_key):
+        state = self._keys.get(api_key)
+        if state is None:
+            state = self._keys[api_key] = _KeyState(TokenBucket(self.rate, self.capacity))
+        return state
+
+    async def acquire(self, api_key, priority=PRIORITY_NORMAL):
+        """
+        Wait for a call slot of `api_key`.
+
+        Args:
+            api_key (str): 0slot.trade api-key the call is made with
+            priority (int): Lower value is served first, see PRIORITY_HIGH / NORMAL / LOW
+
+        Returns:
+            float: Seconds spent waiting in the queue
+        """
+        state = self._state(api_key)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiters, (priority, next(self._sequence), time.monotonic(), future))
+        if state.dispatcher is None or state.dispatcher.done():
+            state.dispatcher = asyncio.create_task(self._dispatch(state))
+        return await future
+
+    async def _dispatch(self, state):
+        bucket = state.bucket
+        while state.waiters:
+            # Drop waiters that gave up (cancelled or timed out)
+            while state.waiters and state.waiters[0][3].done():
+                heapq.heappop(state.waiters)
+            if not state.waiters:
+                break
+            delay = bucket.delay(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            # The waiter is picked only once the token is available, so a high priority
+            # call that arrived during the sleep still goes first.
+            _, _, enqueued_at, future = heapq.heappop(state.waiters)
+            if future.done():
+                continue
+            now = time.monotonic()
+            bucket.take(now)
+            waited = now - enqueued_at
+            state.granted += 1
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+            future.set_result(waited)
+
+    def on_rate_limited(self, api_key):
+        """Report a 419 response: pause the bucket and lower its rate."""
+        state = self._state(api_key)
+        state.rate_limited += 1
+        bucket = state.bucket
+        bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+        bucket.pause(time.monotonic(), self.penalty)
+
+    def on_success(self, api_key):
+        """Report an accepted call: recover the rate toward the configured maximum."""
+        bucket = self._state(api_key).bucket
+        if bucket.rate < self.rate:
+            bucket.rate = min(self.rate, bucket.rate + self.increase)
+
+    def stats(self):
+        """
+        Returns:
+            dict: api-key -> queue depth, current rate, granted calls, 419 count, average and maximum wait
+        """
+        return {
+            api_key: {
+                "queue_depth": sum(1 for waiter in state.waiters if not waiter[3].done()),
+                "rate": state.bucket.rate,
+                "granted": state.granted,
+                "rate_limited": state.rate_limited,
+                "average_wait": state.total_wait / state.granted if state.granted else 0.0,
+                "max_wait": state.max_wait,
+            }
+            for api_key, state in self._keys.items()
+        }
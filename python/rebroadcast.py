@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import Counter, namedtuple
+import aiohttp
+import base58
+from confirmations import ExpiredError
+from rate_limit import MAX_TPS, PRIORITY_LOW, PRIORITY_NORMAL, TokenBucket
+from sender import SendError
+from template import read_compact_u16
+
+"""
+Rebroadcast until landed or expired
+
+main.py and post_binary.py send once and give up. Under congestion a single send is often dropped
+before it reaches a leader, so Rebroadcaster keeps resending the identical signed bytes on a backoff
+curve until the ConfirmationTracker sees the signature land or its blockhash passes
+last_valid_block_height.
+
+The transaction is serialized once and never re-signed: every attempt carries the same signature, so
+the network executes it at most once no matter how many copies arrive. Broadcasting a signature that
+is already in flight joins the running rebroadcast instead of starting a second one.
+
+Resends go through the Sender's RateLimiter at low priority, behind new transactions, and are also
+capped at resend_rate per second so they never use up the per-key budget on their own.
+
+Usage:
+```
+async with ConfirmationTracker(blockhash_cache=client_for_blockhash) as tracker:
+    rebroadcaster = Rebroadcaster(client_for_send, tracker)
+    landing = await rebroadcaster.broadcast(transaction, latest_blockhash.last_valid_block_height)
+    print(landing.signature, landing.attempts, landing.confirmation.latency)
+```
+"""
+
+# Codes after which sending the same bytes again cannot succeed: besides these, every HTTP 4xx except
+# rate limiting and every JSON-RPC request error (-32600 to -32699, invalid params, malformed transaction)
+FATAL_CODES = {403}
+RETRYABLE_CODES = {419, 429}
+
+Landing = namedtuple("Landing", ["signature", "attempts", "confirmation"])
+
+
+def transaction_signature(transaction_bytes):
+    """Base58 first signature of a serialized transaction."""
+    count, offset = read_compact_u16(transaction_bytes, 0)
+    if count < 1:
+        raise ValueError("Transaction has no signature")
+    return base58.b58encode(transaction_bytes[offset:offset + 64]).decode()
+
+
+def is_fatal(code):
+    """True if a SendError code means the same bytes can never be accepted."""
+    if not isinstance(code, int) or code in RETRYABLE_CODES:
+        return False
+    return code in FATAL_CODES or 400 <= code < 500 or -32699 <= code <= -32600
+
+
+class Rebroadcaster:
+    """
+    Resends signed transactions on a backoff curve until they land or expire.
+
+    Args:
+        client_for_send (Sender): Warm sender, its RateLimiter (if any) also paces the resends
+        tracker (ConfirmationTracker): Started tracker resolving the signatures
+        initial_interval (float): Seconds between the first and the second attempt
+        max_interval (float): Upper bound of the interval between attempts
+        backoff (float): Factor the interval grows by after every attempt
+        resend_rate (float): Maximum resends per second over all transactions
+        binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+        nonce_timeout (float): Seconds after which a durable nonce transaction (no last_valid_block_height)
+            that has not landed is given up
+        efficiency (LandingEfficiency): Optional, records every finished transaction with its tip and priority
+            fee, by region, see fees.py
+
+    Attributes:
+        attempts (Counter): Number of finished transactions (landed, expired or rejected) by the attempts they took
+        landed (int): Transactions that landed
+        expired (int): Transactions that expired or were rejected
+    """
+
+    def __init__(self, client_for_send, tracker, initial_interval=0.2, max_interval=2.0, backoff=1.5,
+                 resend_rate=MAX_TPS / 2, binary=False, nonce_timeout=60,
+                 efficiency=None):
+        self.client_for_send = client_for_send
+        self.tracker = tracker
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.resend_bucket = TokenBucket(resend_rate)
+        self.binary = binary
+        self.nonce_timeout = nonce_timeout
+        self.efficiency = efficiency
+        self.attempts = Counter()
+        self.landed = 0
+        self.expired = 0
+        self._active = {}
+
+    async def close(self):
+        """Stop every running rebroadcast."""
+        for task in list(self._active.values()):
+            task.cancel()
+        self._active.clear()
+
+    def broadcast(self, transaction, last_valid_block_height=None, region=None, tip_lamports=0, fee_lamports=0):
+        """
+        Send a signed transaction and keep resending it until it lands or expires.
+
+        Args:
+            transaction: Signed solders Transaction / VersionedTransaction or its serialized bytes
+            last_valid_block_height (int): Expiry of the blockhash, None for durable nonce transactions
+            region (str): Region to send to, defaults to the Sender's choice
+            tip_lamports (int): Tip the transaction pays, for the efficiency metric
+            fee_lamports (int): Priority fee the transaction pays, e.g. FeeOracle.priority_fee_lamports()
+
+        Returns:
+            asyncio.Task: Resolves with a Landing, fails with ExpiredError or the SendError of a fatal rejection
+        """
+        transaction_bytes = bytes(transaction)
+        signature = transaction_signature(transaction_bytes)
+        task = self._active.get(signature)
+        if task is None:
+            task = asyncio.create_task(self._run(signature, transaction_bytes, last_valid_block_height, region,
+                                                 tip_lamports, fee_lamports))
+            self._active[signature] = task
+            task.add_done_callback(lambda _: self._active.pop(signature, None))
+        return task
+
+    async def _wait_resend_slot(self):
+        while True:
+            now = time.monotonic()
+            delay = self.resend_bucket.delay(now)
+            if delay <= 0:
+                self.resend_bucket.take(now)
+                return
+            await asyncio.sleep(delay)
+
+    async def _send(self, transaction_bytes, region, priority):
+        if self.binary:
+            await self.client_for_send.send_binary(transaction_bytes, region=region, priority=priority)
+        else:
+            await self.client_for_send.send_transaction(transaction_bytes, region=region, priority=priority)
+
+    def _record(self, landed, tip_lamports, fee_lamports, region):
+        if self.efficiency is not None:
+            self.efficiency.record(tip_lamports, fee_lamports, landed, label=region)
+
+    async def _run(self, signature, transaction_bytes, last_valid_block_height, region, tip_lamports, fee_lamports):
+        confirmation = self.tracker.track(signature, last_valid_block_height, time.monotonic())
+        # A nonce transaction never expires by block height, give up after nonce_timeout
+        deadline = time.monotonic() + self.nonce_timeout if last_valid_block_height is None else None
+        interval = self.initial_interval
+        attempts = 0
+        try:
+            while not confirmation.done():
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.tracker.expire(signature, f"not landed within {self.nonce_timeout} seconds")
+                    break
+                if attempts:
+                    await self._wait_resend_slot()
+                    if confirmation.done():
+                        break
+                attempts += 1
+                try:
+                    await self._send(transaction_bytes, region, PRIORITY_LOW if attempts > 1 else PRIORITY_NORMAL)
+                except SendError as e:
+                    if is_fatal(e.code):
+                        self.tracker.expire(signature, f"rejected: {e}")
+                        # The SendError is what the caller sees, not the ExpiredError of the tracker
+                        confirmation.exception()
+                        raise
+                    print(f"Send attempt {attempts} of {signature} rejected:", str(e))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Send attempt {attempts} of {signature} failed:", str(e))
+                await asyncio.wait([confirmation], timeout=interval)
+                interval = min(interval * self.backoff, self.max_interval)
+            result = confirmation.result()
+        except (ExpiredError, SendError):
+            self.expired += 1
+            self.attempts[attempts] += 1
+            self._record(False, tip_lamports, fee_lamports, region)
+            raise
+        finally:
+            if not confirmation.done():
+                # Cancelled or failed unexpectedly, the tracker must not keep the signature pending
+                self.tracker.expire(signature, "rebroadcast stopped")
+            if confirmation.done() and not confirmation.cancelled():
+                confirmation.exception()
+        self.landed += 1
+        self.attempts[attempts] += 1
+        self._record(True, tip_lamports, fee_lamports, region)
+        return Landing(signature, attempts, result)
@@ -0,0 +1,219 @@
+import asyncio
+import argparse
+import base64
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from journal import Journal
+from rate_limit import MAX_TPS, RateLimiter
+from sender import Sender, SendError, REGIONS
+
+"""
+Bulk replay of pre-signed transactions
+
+Streams already-signed transactions from a file through the Sender, for backfills and replays. The
+file is memory-mapped and read one transaction at a time, so a multi-gigabyte file never sits in
+memory, and at most --concurrency requests are in flight at once.
+
+Two input formats:
+- JSONL (.jsonl): one transaction per line, either a bare base64 string or an object
+  {"transaction": "<base64>", "region": "de"} where the region is optional
+- binary (anything else): a 4-byte big-endian length followed by the serialized transaction, repeated
+
+Transactions are sent on a schedule at --rate per second, spread round-robin over every (api-key,
+region) pair, and each api-key goes through a RateLimiter so the quota is saturated without 419s.
+One JSON result line per transaction is written to --output:
+{"index": 0, "region": "de", "result": "<signature>", "error": null, "latency": 0.0123}
+A record that cannot be decoded (bad JSON or base64, a truncated binary record) is not sent; its line
+carries the error and a latency of 0, and the replay goes on with the next record.
+
+```
+python replay.py --api_key KEY1 --api_key KEY2 --input backfill.jsonl --rate 10 --output results.jsonl
+python replay.py --api_key KEY --input backfill.bin --url de=http://de1.0slot.trade --binary --journal /tmp/replay
+```
+--journal additionally records every attempt with its phase timings in a binary journal (see journal.py).
+"""
+
+LENGTH_PREFIX = struct.Struct(">I")
+
+
+def iter_jsonl(buffer):
+    """
+    Yields (transaction bytes, region or None, error or None) per non-empty line of a JSONL buffer. A line
+    that cannot be decoded yields (None, None, error message).
+    """
+    offset = 0
+    size = len(buffer)
+    while offset < size:
+        end = buffer.find(b"\n", offset)
+        if end < 0:
+            end = size
+        line = buffer[offset:end].strip()
+        offset = end + 1
+        if not line:
+            continue
+        try:
+            if line.startswith(b"{"):
+                record = json.loads(line)
+                yield base64.b64decode(record["transaction"]), record.get("region"), None
+            else:
+                yield base64.b64decode(line), None, None
+        except (ValueError, KeyError, TypeError) as e:
+            # binascii.Error and json.JSONDecodeError are ValueErrors
+            yield None, None, f"Invalid record: {type(e).__name__}: {e}"
+
+
+def iter_binary(buffer):
+    """
+    Yields (transaction bytes, None, None) per length-prefixed record of a binary buffer, and
+    (None, None, error message) for a truncated last record.
+    """
+    offset = 0
+    size = len(buffer)
+    while offset + LENGTH_PREFIX.size <= size:
+        (length,) = LENGTH_PREFIX.unpack_from(buffer, offset)
+        offset += LENGTH_PREFIX.size
+        if offset + length > size:
+            yield None, None, f"Invalid record: truncated at offset {offset - LENGTH_PREFIX.size}"
+            return
+        yield buffer[offset:offset + length], None, None
+        offset += length
+
+
+def write_binary(path, transactions):
+    """Write signed transactions in the length-prefixed binary format."""
+    with open(path, "wb") as f:
+        for transaction in transactions:
+            transaction_bytes = bytes(transaction)
+            f.write(LENGTH_PREFIX.pack(len(transaction_bytes)))
+            f.write(transaction_bytes)
+
+
+class Replayer:
+    """
+    Sends a stream of signed transactions at a target rate with bounded concurrency.
+
+    Args:
+        senders (list): One Sender per api-key
+        regions (list): Regions to spread the transactions over, a region given per transaction wins
+        rate (float): Target transactions per second, in total
+        concurrency (int): Maximum number of requests in flight
+        binary (bool): Send raw bytes to /txb instead of JSON-RPC sendTransaction
+        output: Writable text file receiving one JSON result line per transaction, or None
+    """
+
+    def __init__(self, senders, regions, rate, concurrency=16, binary=False, output=None):
+        self.senders = senders
+        self.targets = [(sender, region) for sender in senders for region in regions]
+        self.rate = rate
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.binary = binary
+        self.output = output
+        self.sent = 0
+        self.failed = 0
+
+    def _write(self, index, region, result, error, latency):
+        if self.output is not None:
+            self.output.write(json.dumps({"index": index, "region": region, "result": result,
+                                          "error": error, "latency": latency}) + "\n")
+
+    async def _send(self, index, transaction_bytes, region):
+        sender, default_region = self.targets[index % len(self.targets)]
+        region = region or default_region
+        start_time = time.perf_counter()
+        result = error = None
+        try:
+            if self.binary:
+                result = await sender.send_binary(transaction_bytes, region=region)
+            else:
+                result = await sender.send_transaction(transaction_bytes, region=region)
+            self.sent += 1
+        except SendError as e:
+            error = f"{e.code} {e.message}"
+            self.failed += 1
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.failed += 1
+        finally:
+            self.semaphore.release()
+        self._write(index, region, result, error, time.perf_counter() - start_time)
+
+    async def run(self, records):
+        """
+        Send every (transaction bytes, region, error) record on schedule and wait for all responses.
+        Records with an error are written to the output as failed without being sent.
+
+        Returns:
+            float: Seconds from the first send until the last response
+        """
+        interval = 1.0 / self.rate
+        start = time.perf_counter()
+        tasks = set()
+        scheduled = 0
+        for index, (transaction_bytes, region, error) in enumerate(records):
+            if error is not None:
+                self.failed += 1
+                self._write(index, region, None, error, 0.0)
+                continue
+            delay = start + scheduled * interval - time.perf_counter()
+            scheduled += 1
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Waits while `concurrency` requests are in flight, the records are pulled lazily
+            await self.semaphore.acquire()
+            task = asyncio.create_task(self._send(index, transaction_bytes, region))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay pre-signed transactions from a file")
+    parser.add_argument("--api_key", action="append", required=True, help="api-key to spread the load over, repeatable.")
+    parser.add_argument("--input", required=True, help="JSONL (.jsonl) or length-prefixed binary file of signed transactions.")
+    parser.add_argument("--output", help="File receiving one JSON result line per transaction, defaults to stdout.")
+    parser.add_argument("--url", action="append", default=[], metavar="REGION=URL",
+                        help="Region endpoint, repeatable. Defaults to every region in sender.py.")
+    parser.add_argument("--rate", type=float, help="Transactions per second in total, defaults to 5 per api-key.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight.")
+    parser.add_argument("--binary", action="store_true", help="Send raw bytes to /txb.")
+    parser.add_argument("--journal", help="Path prefix of a binary journal recording every attempt.")
+    args = parser.parse_args()
+
+    if os.path.getsize(args.input) == 0:
+        # mmap cannot map an empty file
+        print(f"{args.input} is empty, nothing to replay", file=sys.stderr)
+        return
+    urls = dict(url.split("=", 1) for url in args.url) if args.url else REGIONS
+    rate = args.rate or MAX_TPS * len(args.api_key)
+    rate_limiter = RateLimiter()
+    journal = Journal(args.journal) if args.journal else None
+    senders = [Sender(api_key, regions=list(urls), endpoints=urls, rate_limiter=rate_limiter, journal=journal)
+               for api_key in args.api_key]
+    output = open(args.output, "w") if args.output else None
+    try:
+        with open(args.input, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            records = iter_jsonl(buffer) if args.input.endswith(".jsonl") else iter_binary(buffer)
+            await asyncio.gather(*(sender.start() for sender in senders))
+            if journal is not None:
+                await journal.start()
+            replayer = Replayer(senders, list(urls), rate, args.concurrency, args.binary,
+                                output or sys.stdout)
+            elapsed = await replayer.run(records)
+    finally:
+        for sender in senders:
+            await sender.close()
+        if journal is not None:
+            await journal.close()
+        if output is not None:
+            output.close()
+    print(f"Sent {replayer.sent}, failed {replayer.failed} in {elapsed:.2f} seconds "
+          f"({(replayer.sent + replayer.failed) / elapsed:.2f}/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    asyncio.run(main())
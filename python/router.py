@@ -0,0 +1,101 @@
+"""
+Adaptive region router
+
+Instead of picking a region once from test_speed.py, RegionRouter keeps an exponentially weighted
+moving average (EWMA) of the latency and of the error rate of every region. It is fed by the keep-alive
+heartbeat GETs the Sender already performs (free, they do not count toward TPS) and by the sends
+themselves. Every send without an explicit region goes to the region with the lowest score; a region
+whose error rate rises above max_error_rate is skipped until it recovers.
+
+Network paths change during the day, lower the Sender heartbeat_interval (e.g. 5 seconds) to let the
+router react faster.
+
+Usage:
+```
+router = RegionRouter(["de", "ny", "ams"])
+async with Sender(api_key, regions=["de", "ny", "ams"], router=router, heartbeat_interval=5) as client_for_send:
+    signature = await client_for_send.send_transaction(transaction)
+```
+"""
+
+
+class RegionStats:
+    """
+    EWMA state of one region.
+
+    Attributes:
+        latency (float): EWMA of successful request latency in seconds, None until the first success
+        error_rate (float): EWMA of the failure ratio, between 0 and 1
+        samples (int): Number of observations
+    """
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = 0
+
+
+class RegionRouter:
+    """
+    Chooses the currently best region from observed latencies and errors.
+
+    Args:
+        regions (list): Candidate regions, the order breaks ties before any observation
+        alpha (float): EWMA weight of a new observation
+        error_penalty (float): Score multiplier per unit of error rate
+        max_error_rate (float): Regions above this error rate are only used if no other region is left
+    """
+
+    def __init__(self, regions, alpha=0.2, error_penalty=10.0, max_error_rate=0.5):
+        self.regions = list(regions)
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.max_error_rate = max_error_rate
+        self.stats = {region: RegionStats() for region in self.regions}
+
+    def observe(self, region, latency=None, error=False):
+        """
+        Record the outcome of a request to `region`.
+
+        Args:
+            region (str): Region the request went to
+            latency (float): Seconds until the response, ignored for errors
+            error (bool): The request failed at the connection level
+        """
+        stats = self.stats.get(region)
+        if stats is None:
+            return
+        stats.samples += 1
+        stats.error_rate += self.alpha * ((1.0 if error else 0.0) - stats.error_rate)
+        if not error and latency is not None:
+            stats.latency = latency if stats.latency is None else stats.latency + self.alpha * (latency - stats.latency)
+
+    def score(self, region):
+        """Expected cost of `region`, lower is better. None for a region without a successful observation."""
+        stats = self.stats[region]
+        if stats.latency is None:
+            return None
+        return stats.latency * (1 + self.error_penalty * stats.error_rate)
+
+    def ranking(self, exclude=()):
+        """
+        Returns:
+            list: Regions from best to worst; healthy measured regions first, then unmeasured, then degraded
+        """
+        def key(item):
+            position, region = item
+            stats = self.stats[region]
+            score = self.score(region)
+            degraded = stats.error_rate > self.max_error_rate
+            return (degraded, score is None, score if score is not None else 0.0, position)
+
+        candidates = [(position, region) for position, region in enumerate(self.regions) if region not in exclude]
+        return [region for _, region in sorted(candidates, key=key)]
+
+    def best(self, exclude=()):
+        """
+        Returns:
+            str: The best region not in `exclude`, None if every region is excluded
+        """
+        ranking = self.ranking(exclude)
+        return ranking[0] if ranking else None
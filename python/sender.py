@@ -0,0 +1,391 @@
+import asyncio
+import base64
+import json
+import time
+from contextlib import nullcontext
+import aiohttp
+from journal import ERROR_CONNECTION, ERROR_UNKNOWN
+from rate_limit import PRIORITY_NORMAL
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+"""
+Long-lived sender for 0slot.trade
+
+Creating an AsyncClient / aiohttp.ClientSession for every transaction pays DNS, TCP and TLS setup
+on the hot path. Sender owns one connection pool per region, opens the sockets up front and keeps
+them alive in the background, so every send goes out on an already-open socket.
+
+The send path does no per-transaction JSON work: the JSON-RPC envelope is pre-rendered around the
+base64 payload, and a successful response is decoded by scanning the bytes for the "result" string.
+Only error responses (and anything the scan does not recognize) go through a JSON parser, orjson
+when it is installed.
+
+0slot.trade closes an idle Keep-Alive connection after 65 seconds. The heartbeat performs a GET
+without the api-key approximately every 60 seconds, which does not count toward TPS calculations.
+
+Usage:
+```
+async with Sender(api_key, regions=["de", "ny"]) as client_for_send:
+    signature = await client_for_send.send_transaction(transaction, region="de")
+```
+"""
+
+# prioritize using the ones provided by the sales team, as HTTP is more efficient than HTTPS
+REGIONS = {
+    "ny": "https://ny.0slot.trade",   # New York
+    "de": "https://de.0slot.trade",   # Frankfurt
+    "ams": "https://ams.0slot.trade", # Amsterdam
+    "jp": "https://jp.0slot.trade",   # Tokyo
+    "la": "https://la.0slot.trade",   # Los Angeles
+}
+
+# sendTransaction envelope, the base64 transaction goes between prefix and suffix
+RPC_PREFIX = b'{"jsonrpc":"2.0","id":1,"method":"sendTransaction","params":["'
+RPC_SUFFIX = b'",{"encoding":"base64"}]}'
+RPC_HEADERS = {"Content-Type": "application/json"}
+
+# The maximum duration for a 0slot.trade keep is 65 seconds, access it approximately every 60 seconds.
+KEEPALIVE_TIMEOUT = 65
+HEARTBEAT_INTERVAL = 60
+
+# Largest serialized transaction a leader accepts (IPv6 MTU minus headers)
+PACKET_DATA_SIZE = 1232
+
+
+class SendError(Exception):
+    """
+    Raised when 0slot.trade rejects a transaction.
+
+    Attributes:
+        code (int): JSON-RPC error code (403, 419, ...) or the HTTP status for /txb
+        message (str): Error message returned by the server
+        region (str): Region the transaction was sent to
+    """
+
+    def __init__(self, code, message, region=None):
+        super().__init__(f"{code} {message}" + (f" ({region})" if region else ""))
+        self.code = code
+        self.message = message
+        self.region = region
+
+
+def scan_result(body):
+    """
+    Extract the "result" string of a compact JSON-RPC response without parsing it.
+
+    Returns:
+        str: The result, None if the body has no compact string result (error, whitespace, ...)
+    """
+    # An error object may nest a "result" of its own (e.g. simulation details), leave errors to the JSON parser
+    if b'"error"' in body:
+        return None
+    start = body.find(b'"result":"')
+    if start < 0:
+        return None
+    start += 10
+    end = body.find(b'"', start)
+    if end < 0 or body.find(b"\\", start, end) >= 0:
+        return None
+    return body[start:end].decode()
+
+
+class Sender:
+    """
+    Reusable sender that keeps a warm connection pool per region.
+
+    Args:
+        api_key (str): 0slot.trade api-key
+        regions (list): Region names from REGIONS to connect to, defaults to all of them
+        endpoints (dict): Optional region -> base URL overrides, e.g. the HTTP endpoints from the sales team
+        connections_per_region (int): Number of sockets kept open per region
+        heartbeat_interval (float): Seconds between keep-alive GETs
+        rate_limiter (RateLimiter): Optional limiter every send waits on, see rate_limit.py
+        router (RegionRouter): Optional router choosing the region of sends without an explicit one, see router.py
+        instrumentation (Instrumentation): Optional per-phase timing of serialize / http_write / ttfb / response_parse
+        journal (Journal): Optional binary journal recording every send attempt, see journal.py
+        connection_layer (ConnectionLayer): Optional started layer providing cached DNS, TLS session resumption
+            and the plain-HTTP endpoints, see connection.py
+        slot_clock (SlotClock): Optional started clock, sends without an explicit region go to the region of the
+            upcoming leader and a slot_offset holds a send until that point of the next slot, see slots.py
+    """
+
+    def __init__(self, api_key, regions=None, endpoints=None, connections_per_region=2,
+                 heartbeat_interval=HEARTBEAT_INTERVAL, timeout=10, rate_limiter=None,
+                 router=None, instrumentation=None, journal=None, connection_layer=None, slot_clock=None):
+        urls = dict(REGIONS)
+        if connection_layer is not None:
+            urls.update(connection_layer.endpoints)
+        urls.update(endpoints or {})
+        self.api_key = api_key
+        self.regions = list(regions or urls)
+        self.endpoints = {region: urls[region].rstrip("/") for region in self.regions}
+        self.connections_per_region = connections_per_region
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.rate_limiter = rate_limiter
+        self.router = router
+        self.instrumentation = instrumentation
+        self.journal = journal
+        self.connection_layer = connection_layer
+        self.slot_clock = slot_clock
+        self._trace_configs = [instrumentation.trace_config()] if instrumentation is not None else []
+        self._sessions = {}
+        self._heartbeat_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _session(self, region):
+        # Sessions are created lazily so that a Sender can also be used without start()
+        session = self._sessions.get(region)
+        if session is None:
+            if self.connection_layer is not None:
+                connector = self.connection_layer.connector(self.connections_per_region, KEEPALIVE_TIMEOUT)
+            else:
+                connector = aiohttp.TCPConnector(
+                    limit=self.connections_per_region,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=None,
+                )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                            trace_configs=self._trace_configs)
+            self._sessions[region] = session
+        return session
+
+    async def start(self):
+        """Open connections_per_region sockets to every region and start the heartbeat."""
+        await self.heartbeat()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    def _observe(self, region, latency):
+        # Connection level outcome of a request, latency is None for a failure
+        if self.router is not None:
+            self.router.observe(region, latency, error=latency is None)
+
+    async def _ping(self, region):
+        # GET without the api-key, does not count toward TPS
+        start_time = time.perf_counter()
+        try:
+            async with self._session(region).get(self.endpoints[region]) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._observe(region, None)
+            raise
+        self._observe(region, time.perf_counter() - start_time)
+        return response.status
+
+    async def heartbeat(self):
+        """
+        Touch every pooled socket once.
+
+        Concurrent GETs each take a different idle connection from the pool, so issuing
+        connections_per_region of them per region refreshes (or opens) all of the sockets.
+
+        Returns:
+            dict: region -> list of HTTP statuses or exceptions
+        """
+        pings = [(region, self._ping(region))
+                 for region in self.regions for _ in range(self.connections_per_region)]
+        results = await asyncio.gather(*(ping for _, ping in pings), return_exceptions=True)
+        if self.connection_layer is not None:
+            # Keep the newest TLS sessions for connections reopened after an idle timeout
+            self.connection_layer.ssl_context.harvest()
+        statuses = {region: [] for region in self.regions}
+        for (region, _), result in zip(pings, results):
+            statuses[region].append(result)
+        return statuses
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            statuses = await self.heartbeat()
+            for region, results in statuses.items():
+                for result in results:
+                    if isinstance(result, Exception):
+                        print(f"Heartbeat to {region} failed: {result}")
+
+    async def _acquire(self, priority):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self.api_key, priority)
+
+    def _report(self, error):
+        # Feed the outcome back into the adaptive backoff of the rate limiter
+        if self.rate_limiter is None:
+            return
+        if error is None:
+            self.rate_limiter.on_success(self.api_key)
+        elif error.code == 419:
+            self.rate_limiter.on_rate_limited(self.api_key)
+
+    def _phase(self, phase, **labels):
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.phase(phase, **labels)
+
+    def _journal_attempt(self, attempt, region, request_start, read_start, status, error_code):
+        # attempt is (transaction bytes, serialize ns), None without a journal
+        if attempt is None:
+            return
+        now = time.perf_counter_ns()
+        read_start = read_start or now
+        self.journal.record(region, attempt[0], attempt[1], read_start - request_start, now - read_start,
+                            status, error_code)
+
+    async def _post(self, region, path, priority, parse, attempt, slot_offset=None, **kwargs):
+        url = f"{self.endpoints[region]}{path}?api-key={self.api_key}"
+        await self._acquire(priority)
+        if slot_offset is not None:
+            # Held after the rate limiter released the send, only the write is left when the clock releases it
+            await self.slot_clock.wait(slot_offset)
+        start_time = time.perf_counter()
+        request_start = time.perf_counter_ns()
+        try:
+            async with self._session(region).post(url, trace_request_ctx={"region": region}, **kwargs) as response:
+                read_start = time.perf_counter_ns()
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._observe(region, None)
+            self._journal_attempt(attempt, region, request_start, None, 0, ERROR_CONNECTION)
+            raise
+        self._observe(region, time.perf_counter() - start_time)
+        # Anything but a parsed result is journaled as an error, 0 would count as a success
+        error_code = ERROR_UNKNOWN
+        try:
+            result = parse(response.status, body, region)
+            error_code = 0
+            return result
+        except SendError as error:
+            if isinstance(error.code, int) and error.code:
+                error_code = error.code
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.record("response_parse", time.perf_counter_ns() - read_start, region=region)
+            self._journal_attempt(attempt, region, request_start, read_start, response.status, error_code)
+
+    async def _send(self, region, path, priority, parse, attempt, slot_offset=None, **kwargs):
+        if self.slot_clock is None:
+            slot_offset = None
+        elif region is None:
+            # The leader of the slot the send is held for
+            slot = self.slot_clock.target_slot(slot_offset) if slot_offset is not None else None
+            region = self.slot_clock.region(slot, regions=self.regions)
+        if region is not None or self.router is None:
+            return await self._post(region or self.regions[0], path, priority, parse, attempt, slot_offset, **kwargs)
+        # Let the router pick the region and fail over to the next best one on connection errors.
+        # The payload is the same signed transaction, so sending it again elsewhere cannot execute it twice.
+        tried = []
+        while True:
+            region = self.router.best(exclude=tried)
+            try:
+                return await self._post(region, path, priority, parse, attempt, slot_offset, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                tried.append(region)
+                if self.router.best(exclude=tried) is None:
+                    raise
+
+    async def _send_reported(self, region, path, priority, parse, attempt, **kwargs):
+        try:
+            result = await self._send(region, path, priority, parse, attempt, **kwargs)
+        except SendError as error:
+            self._report(error)
+            raise
+        self._report(None)
+        return result
+
+    @staticmethod
+    def _parse_rpc(status, body, region):
+        if status == 200:
+            signature = scan_result(body)
+            if signature is not None:
+                return signature
+        try:
+            result = json_loads(body)
+        except ValueError:
+            raise SendError(status, body.decode("utf-8", "replace"), region)
+        if not isinstance(result, dict):
+            raise SendError(status, body.decode("utf-8", "replace"), region)
+        error = result.get("error")
+        if isinstance(error, dict):
+            raise SendError(error.get("code", status), error.get("message"), region)
+        if error is not None:
+            raise SendError(status, str(error), region)
+        if status != 200 or "result" not in result:
+            # e.g. a proxy's {"message": ...} on a 502
+            raise SendError(status, result.get("message") or body.decode("utf-8", "replace"), region)
+        return result["result"]
+
+    @staticmethod
+    def _parse_binary(status, body, region):
+        if status != 200:
+            raise SendError(status, body.decode("utf-8", "replace"), region)
+        return body.decode("utf-8", "replace")
+
+    async def send_transaction(self, transaction, region=None, priority=PRIORITY_NORMAL, slot_offset=None):
+        """
+        Send a signed transaction with the JSON-RPC sendTransaction method.
+
+        Args:
+            transaction: Signed solders Transaction / VersionedTransaction or its serialized bytes
+            region (str): Region to send to, defaults to the router's best region or the first configured one
+            priority (int): Queue priority when a rate limiter is configured
+            slot_offset (float): With a slot_clock, hold the send until this many seconds after the start of
+                the next slot (negative: before it)
+
+        Returns:
+            str: Transaction signature
+        """
+        serialize_start = time.perf_counter_ns()
+        with self._phase("serialize", encoding="base64"):
+            transaction_bytes = bytes(transaction)
+            body = RPC_PREFIX + base64.b64encode(transaction_bytes) + RPC_SUFFIX
+        attempt = None
+        if self.journal is not None:
+            attempt = (transaction_bytes, time.perf_counter_ns() - serialize_start)
+        return await self._send_reported(region, "", priority, self._parse_rpc, attempt,
+                                         slot_offset=slot_offset, data=body, headers=RPC_HEADERS)
+
+    async def send_binary(self, transaction, region=None, priority=PRIORITY_NORMAL, slot_offset=None):
+        """
+        Send a signed transaction as raw bytes to the /txb endpoint.
+
+        Args:
+            transaction: Signed solders Transaction / VersionedTransaction or its serialized bytes
+            region (str): Region to send to, defaults to the router's best region or the first configured one
+            priority (int): Queue priority when a rate limiter is configured
+            slot_offset (float): With a slot_clock, hold the send until this many seconds after the start of
+                the next slot (negative: before it)
+
+        Returns:
+            str: Response body
+        """
+        serialize_start = time.perf_counter_ns()
+        with self._phase("serialize", encoding="binary"):
+            transaction_bytes = bytes(transaction)
+        attempt = None
+        if self.journal is not None:
+            attempt = (transaction_bytes, time.perf_counter_ns() - serialize_start)
+        return await self._send_reported(region, "/txb", priority, self._parse_binary, attempt,
+                                         slot_offset=slot_offset, data=transaction_bytes)
@@ -0,0 +1,195 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import base58
+from solders.keypair import Keypair
+from solders.message import Message, to_bytes_versioned
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import Transaction, VersionedTransaction
+
+"""
+Signer registry
+
+Every example decodes its private key with Keypair.from_bytes(base58.b58decode(private_key)) on each
+send, and signs on the event loop thread, where an ed25519 signature (~70us, more with several
+signers) delays every other send waiting on the loop.
+
+SignerRegistry decodes each keypair once and resolves it by pubkey. sign_batch() signs many messages
+at once, e.g. the copies of a nonce fan-out or a replay batch: the message bytes are split across a
+worker pool whose workers were given the secrets once at startup (the initializer), each worker
+returns only the 64-byte signatures, and the transactions are assembled with Transaction.populate.
+The pool uses processes by default, so signing runs in parallel and never holds the loop's GIL;
+threads=True avoids the inter-process copies but only keeps the loop responsive. Batches smaller
+than min_batch are signed inline, where the hand-off would cost more than it saves.
+
+Usage:
+```
+signers = SignerRegistry([private_key])
+sender = signers.load(private_key)  # or signers.get(payer_pubkey)
+transactions = await signers.sign_batch(messages)
+```
+"""
+
+# Keypairs of a pool worker, by pubkey bytes
+_worker_keypairs = {}
+
+
+def _init_worker(secrets):
+    for secret in secrets:
+        keypair = Keypair.from_bytes(secret)
+        _worker_keypairs[bytes(keypair.pubkey())] = keypair
+
+
+def _sign_chunk(chunk):
+    # (message bytes, [signer pubkey bytes]) -> [signature bytes]
+    return [[bytes(_worker_keypairs[signer].sign_message(message_bytes)) for signer in signers]
+            for message_bytes, signers in chunk]
+
+
+def load_keypair(private_key):
+    """Keypair from a base58 private key string, secret bytes or a Keypair."""
+    if isinstance(private_key, Keypair):
+        return private_key
+    if isinstance(private_key, str):
+        private_key = base58.b58decode(private_key)
+    return Keypair.from_bytes(private_key)
+
+
+def message_signing_bytes(message):
+    """The bytes a signature covers, for a legacy Message or a MessageV0."""
+    return bytes(message) if isinstance(message, Message) else to_bytes_versioned(message)
+
+
+def required_signers(message):
+    return list(message.account_keys[:message.header.num_required_signatures])
+
+
+def with_blockhash(message, blockhash):
+    """
+    Copy of a legacy message with its recent blockhash set, e.g. the nonce value of a message built with
+    Message.new_with_nonce, which leaves the blockhash empty.
+    """
+    header = message.header
+    return Message.new_with_compiled_instructions(
+        header.num_required_signatures, header.num_readonly_signed_accounts, header.num_readonly_unsigned_accounts,
+        message.account_keys, blockhash, message.instructions)
+
+
+class SignerRegistry:
+    """
+    Keypairs decoded once and looked up by pubkey, with batch signing on a worker pool.
+
+    Args:
+        private_keys (list): base58 private keys, secret bytes or Keypairs
+        workers (int): Size of the worker pool, defaults to the number of CPUs
+        threads (bool): Use a thread pool instead of a process pool
+        min_batch (int): Batches smaller than this are signed inline on the calling thread
+    """
+
+    def __init__(self, private_keys=(), workers=None, threads=False, min_batch=8):
+        self.keypairs = {}
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.min_batch = min_batch
+        self._executor = None
+        self._loaded = {}
+        for private_key in private_keys:
+            self.add(private_key)
+
+    def add(self, private_key):
+        """
+        Register a keypair.
+
+        Returns:
+            Pubkey: Its public key
+        """
+        keypair = load_keypair(private_key)
+        pubkey = keypair.pubkey()
+        if pubkey not in self.keypairs:
+            self.keypairs[pubkey] = keypair
+            # Workers only learn the secrets at startup, the next batch starts a fresh pool
+            self.shutdown()
+        return pubkey
+
+    def load(self, private_key):
+        """Keypair of a private key, decoded and registered only on the first call."""
+        if isinstance(private_key, Keypair):
+            return self.keypairs[self.add(private_key)]
+        keypair = self._loaded.get(private_key)
+        if keypair is None:
+            keypair = self._loaded[private_key] = self.keypairs[self.add(private_key)]
+        return keypair
+
+    def get(self, pubkey):
+        """Keypair of a pubkey (Pubkey or base58 string), KeyError if it is not registered."""
+        if isinstance(pubkey, str):
+            pubkey = Pubkey.from_string(pubkey)
+        return self.keypairs[pubkey]
+
+    def __contains__(self, pubkey):
+        return pubkey in self.keypairs
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            secrets = [bytes(keypair) for keypair in self.keypairs.values()]
+            executor_class = ThreadPoolExecutor if self.threads else ProcessPoolExecutor
+            self._executor = executor_class(self.workers, initializer=_init_worker, initargs=(secrets,))
+        return self._executor
+
+    def sign(self, message, signers=None):
+        """
+        Sign one message inline.
+
+        Args:
+            message: Message or MessageV0, its recent blockhash or nonce is already set
+            signers (list): Signer pubkeys in the order of the message, defaults to its required signers
+
+        Returns:
+            Transaction or VersionedTransaction
+        """
+        message_bytes = message_signing_bytes(message)
+        signatures = [self.keypairs[signer].sign_message(message_bytes)
+                      for signer in (signers or required_signers(message))]
+        return self._populate(message, signatures)
+
+    @staticmethod
+    def _populate(message, signatures):
+        if isinstance(message, Message):
+            return Transaction.populate(message, signatures)
+        return VersionedTransaction.populate(message, signatures)
+
+    async def sign_batch(self, messages, signers=None):
+        """
+        Sign many messages on the worker pool without blocking the event loop.
+
+        Args:
+            messages (list): Message or MessageV0 per transaction
+            signers (list): Signer pubkeys per message, defaults to the required signers of each message
+
+        Returns:
+            list: Signed Transaction / VersionedTransaction per message, in order
+        """
+        signers = signers or [required_signers(message) for message in messages]
+        if len(messages) < self.min_batch:
+            return [self.sign(message, message_signers) for message, message_signers in zip(messages, signers)]
+        for message_signers in signers:
+            for signer in message_signers:
+                if signer not in self.keypairs:
+                    raise KeyError(f"No keypair registered for {signer}")
+        jobs = [(message_signing_bytes(message), [bytes(signer) for signer in message_signers])
+                for message, message_signers in zip(messages, signers)]
+        pool = self._pool()
+        chunk_size = -(-len(jobs) // self.workers)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(loop.run_in_executor(pool, _sign_chunk, jobs[start:start + chunk_size])
+                                        for start in range(0, len(jobs), chunk_size)))
+        signatures = [signature for chunk in chunks for signature in chunk]
+        return [self._populate(message, [Signature.from_bytes(signature) for signature in message_signatures])
+                for message, message_signatures in zip(messages, signatures)]
+
@@ -0,0 +1,443 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Processed
+from blockhash import SLOT_DURATION
+from histogram import Histogram
+
+"""
+Slot clock and leader schedule
+
+A transaction reaches the leader through staked_conn, and whether it lands in the current slot or the
+next one is decided by milliseconds. SlotClock follows the cluster's slots from a feed of slot updates
+and fits the start time of every slot with a least squares line over the last `samples` observed slot
+changes, which absorbs the jitter of individual updates and measures the real slot duration instead of
+assuming 400ms. With it a send can be held until a chosen point of a slot:
+
+    await clock.wait(-0.05)    # 50ms before the next slot starts
+    await clock.wait(0.0, slot) # right as `slot` starts
+
+LeaderSchedule caches getLeaderSchedule once per epoch (432000 slots, about two days) and fetches the
+next epoch's schedule in the background before the current one ends. With a leader_regions mapping
+(validator identity -> 0slot.trade region, e.g. from a JSON file) the clock names the region closest to
+the upcoming leader; a Sender given the clock sends there unless a region is passed explicitly, and
+holds a send until slot_offset when one is given (see sender.py).
+
+The feeds report (slot, time.monotonic()) pairs:
+- RpcSlotFeed polls getSlot at processed commitment, a slot change is seen on average half a poll
+  interval late, which the clock subtracts (feed.delay)
+- SimulatedSlotFeed ticks locally with a known slot duration, jitter and delay, for timing tests
+
+```
+python slots.py --simulate                  # alignment error of wait(), exit code 1 above --max_error_ms
+python slots.py --leader_regions leaders.json  # live slot, time into the slot and upcoming leaders
+```
+
+Usage:
+```
+async with SlotClock(RpcSlotFeed(), LeaderSchedule(), leader_regions={"<identity>": "ny"}) as clock:
+    async with Sender(api_key, regions=["de", "ny"], slot_clock=clock) as client_for_send:
+        signature = await client_for_send.send_transaction(transaction, slot_offset=-0.05)
+```
+"""
+
+# Slots per leader rotation
+LEADER_SLOTS = 4
+# Fetch the next epoch's leader schedule this many slots before the epoch ends (about 10 minutes)
+PREFETCH_SLOTS = 1500
+# Seconds before a failed leader schedule fetch is retried
+RETRY_INTERVAL = 30
+
+
+class RpcSlotFeed:
+    """
+    Slot updates from getSlot polls.
+
+    Args:
+        rpc_url (str): RPC endpoint used for getSlot
+        poll_interval (float): Seconds between polls
+
+    Attributes:
+        delay (float): Average delay between the start of a slot and its report
+    """
+
+    def __init__(self, rpc_url="https://api.mainnet-beta.solana.com", poll_interval=0.05):
+        self.client = AsyncClient(rpc_url, commitment=Processed)
+        self.poll_interval = poll_interval
+        self.delay = poll_interval / 2
+
+    async def updates(self):
+        while True:
+            request_start = time.monotonic()
+            try:
+                slot = (await self.client.get_slot()).value
+            except Exception as e:
+                print("Slot poll failed:", str(e))
+            else:
+                # The middle of the round-trip is the best guess of when the node answered
+                yield slot, (request_start + time.monotonic()) / 2
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - request_start)))
+
+    async def close(self):
+        await self.client.close()
+
+
+class SimulatedSlotFeed:
+    """
+    Local slot feed with a known timeline.
+
+    Slot `start_slot + n` starts at started_at + n * slot_duration and is reported `delay` seconds later,
+    plus a uniformly random jitter of up to `jitter` seconds. Some updates are dropped with probability
+    drop_rate, as a poll or a websocket message can be missed.
+
+    Args:
+        slot_duration (float): Seconds per slot
+        start_slot (int): First slot reported
+        delay (float): Fixed reporting delay in seconds
+        jitter (float): Maximum random reporting delay on top of `delay`
+        drop_rate (float): Probability of an update not being reported
+        seed (int): Random seed, for reproducible runs
+    """
+
+    def __init__(self, slot_duration=SLOT_DURATION, start_slot=0, delay=0.0, jitter=0.0, drop_rate=0.0, seed=None):
+        self.slot_duration = slot_duration
+        self.start_slot = start_slot
+        self.delay = delay + jitter / 2
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.started_at = None
+
+    def slot_start(self, slot):
+        """True start time of a slot."""
+        return self.started_at + (slot - self.start_slot) * self.slot_duration
+
+    def slot_at(self, now):
+        """True slot at a time.monotonic() value."""
+        return self.start_slot + int((now - self.started_at) // self.slot_duration)
+
+    async def updates(self):
+        self.started_at = time.monotonic()
+        slot = self.start_slot
+        while True:
+            report_at = self.slot_start(slot) + self.delay - self.jitter / 2 + self.random.uniform(0, self.jitter)
+            await asyncio.sleep(max(0.0, report_at - time.monotonic()))
+            if self.random.random() >= self.drop_rate:
+                yield slot, report_at
+            slot += 1
+
+    async def close(self):
+        pass
+
+
+class LeaderSchedule:
+    """
+    Leader of every slot, fetched once per epoch.
+
+    Args:
+        rpc_url (str): RPC endpoint used for getEpochInfo / getLeaderSchedule
+    """
+
+    def __init__(self, rpc_url="https://api.mainnet-beta.solana.com"):
+        self.client = AsyncClient(rpc_url)
+        self.first_slot = None
+        self.epoch = None
+        self.slots_in_epoch = None
+        # epoch -> list of leader identities by slot index
+        self.epochs = {}
+        self._loading = {}
+        self._failed_at = {}
+
+    async def close(self):
+        for task in self._loading.values():
+            task.cancel()
+        await self.client.close()
+
+    def epoch_of(self, slot):
+        """(epoch, slot index) of a slot, None before the first load."""
+        if self.first_slot is None:
+            return None
+        epochs, index = divmod(slot - self.first_slot, self.slots_in_epoch)
+        return self.epoch + epochs, index
+
+    def set_epoch(self, epoch, first_slot, slots_in_epoch, schedule):
+        """
+        Store the schedule of an epoch.
+
+        Args:
+            epoch (int): Epoch number
+            first_slot (int): Absolute first slot of the epoch
+            slots_in_epoch (int): Epoch length
+            schedule (dict): Leader identity -> slot indexes within the epoch, as getLeaderSchedule returns
+        """
+        if self.first_slot is None:
+            self.epoch, self.first_slot, self.slots_in_epoch = epoch, first_slot, slots_in_epoch
+        leaders = [None] * slots_in_epoch
+        for identity, indexes in schedule.items():
+            for index in indexes:
+                leaders[index] = str(identity)
+        self.epochs[epoch] = leaders
+
+    async def load(self, slot=None):
+        """Fetch the schedule of the epoch containing `slot`, the current epoch by default."""
+        if self.first_slot is None:
+            info = (await self.client.get_epoch_info()).value
+            self.epoch, self.first_slot = info.epoch, info.absolute_slot - info.slot_index
+            self.slots_in_epoch = info.slots_in_epoch
+        if slot is None:
+            slot = self.first_slot
+        epoch, index = self.epoch_of(slot)
+        if epoch in self.epochs:
+            return
+        schedule = (await self.client.get_leader_schedule(slot)).value
+        if schedule is None:
+            raise RuntimeError(f"No leader schedule for epoch {epoch}")
+        self.set_epoch(epoch, slot - index, self.slots_in_epoch, schedule)
+
+    def prefetch(self, slot):
+        """Load the schedule of the epoch containing `slot` in the background, once."""
+        epoch = self.epoch_of(slot)
+        if epoch is None or epoch[0] in self.epochs or epoch[0] in self._loading:
+            return
+        if time.monotonic() - self._failed_at.get(epoch[0], -RETRY_INTERVAL) < RETRY_INTERVAL:
+            return
+        task = asyncio.create_task(self.load(slot))
+        self._loading[epoch[0]] = task
+        task.add_done_callback(lambda task: self._loaded(epoch[0], task))
+
+    def _loaded(self, epoch, task):
+        self._loading.pop(epoch, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Retried by a prefetch after RETRY_INTERVAL
+            self._failed_at[epoch] = time.monotonic()
+            print(f"Leader schedule fetch for epoch {epoch} failed:", repr(task.exception()))
+
+    def leader(self, slot):
+        """Identity of the leader of `slot`, None if its epoch is not loaded."""
+        epoch = self.epoch_of(slot)
+        if epoch is None or epoch[0] not in self.epochs:
+            return None
+        return self.epochs[epoch[0]][epoch[1]]
+
+
+class SlotClock:
+    """
+    Current slot and slot boundaries estimated from a slot feed.
+
+    Args:
+        feed: RpcSlotFeed, SimulatedSlotFeed or any object with an async updates() generator of
+            (slot, time.monotonic()) pairs and a delay attribute
+        leader_schedule (LeaderSchedule): Optional, enables leader() and region()
+        leader_regions (dict): Validator identity -> region closest to it
+        samples (int): Number of slot changes the boundaries are fitted over
+        lookahead (int): Slots ahead of the current one whose leader region() returns, the slot a send
+            arrives in
+
+    Attributes:
+        slot (int): Newest slot reported by the feed
+        slot_duration (float): Fitted seconds per slot
+    """
+
+    def __init__(self, feed, leader_schedule=None, leader_regions=None, samples=64, lookahead=1):
+        self.feed = feed
+        self.leader_schedule = leader_schedule
+        self.leader_regions = dict(leader_regions or {})
+        self.lookahead = lookahead
+        self.slot = None
+        self.slot_duration = SLOT_DURATION
+        self._observations = deque(maxlen=samples)
+        self._anchor = None
+        self._first_update = None
+        self._feed_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self, timeout=10):
+        """Start following the feed and wait for the first slot and leader schedule."""
+        if self._feed_task is None:
+            self._first_update = asyncio.get_running_loop().create_future()
+            self._feed_task = asyncio.create_task(self._feed_loop())
+        await asyncio.wait_for(asyncio.shield(self._first_update), timeout)
+        if self.leader_schedule is not None:
+            await self.leader_schedule.load(self.slot)
+
+    async def close(self):
+        if self._feed_task is not None:
+            self._feed_task.cancel()
+            try:
+                await self._feed_task
+            except asyncio.CancelledError:
+                pass
+            self._feed_task = None
+        await self.feed.close()
+        if self.leader_schedule is not None:
+            await self.leader_schedule.close()
+
+    async def _feed_loop(self):
+        async for slot, timestamp in self.feed.updates():
+            self.observe(slot, timestamp)
+
+    def observe(self, slot, timestamp):
+        """Record a slot update, only the first report of every newer slot marks a boundary."""
+        if self.slot is not None and slot <= self.slot:
+            return
+        self.slot = slot
+        self._observations.append((slot, timestamp - self.feed.delay))
+        self._fit()
+        if not self._first_update.done():
+            self._first_update.set_result(slot)
+        if self.leader_schedule is not None:
+            self.leader_schedule.prefetch(slot + PREFETCH_SLOTS)
+
+    def _fit(self):
+        # Least squares line start_time = anchor_time + (slot - anchor_slot) * slot_duration
+        observations = self._observations
+        count = len(observations)
+        anchor_slot = observations[-1][0]
+        mean_slot = sum(slot for slot, _ in observations) / count - anchor_slot
+        mean_time = sum(start for _, start in observations) / count
+        if count > 1:
+            variance = sum((slot - anchor_slot - mean_slot) ** 2 for slot, _ in observations)
+            if variance > 0:
+                self.slot_duration = sum((slot - anchor_slot - mean_slot) * (start - mean_time)
+                                         for slot, start in observations) / variance
+        self._anchor = (anchor_slot, mean_time - mean_slot * self.slot_duration)
+
+    def slot_start(self, slot):
+        """Estimated time.monotonic() at which `slot` starts."""
+        anchor_slot, anchor_time = self._anchor
+        return anchor_time + (slot - anchor_slot) * self.slot_duration
+
+    def current_slot(self, now=None):
+        """Slot in progress at `now`, extrapolated between updates."""
+        anchor_slot, anchor_time = self._anchor
+        now = now if now is not None else time.monotonic()
+        return anchor_slot + int((now - anchor_time) // self.slot_duration)
+
+    def time_in_slot(self, now=None):
+        """Seconds since the current slot started."""
+        now = now if now is not None else time.monotonic()
+        return now - self.slot_start(self.current_slot(now))
+
+    def target_slot(self, offset=0.0, now=None):
+        """First slot whose start + offset is still ahead of `now`."""
+        now = now if now is not None else time.monotonic()
+        return self.current_slot(now - offset) + 1
+
+    async def wait(self, offset=0.0, slot=None):
+        """
+        Hold until `offset` seconds after the start of a slot.
+
+        Args:
+            offset (float): Seconds relative to the slot start, negative to wake up before the boundary
+            slot (int): Target slot, defaults to the first slot whose start + offset is still ahead
+
+        Returns:
+            int: The target slot
+        """
+        if slot is None:
+            slot = self.target_slot(offset)
+        # Re-read the estimate after every sleep, updates arriving meanwhile refine it
+        while True:
+            remaining = self.slot_start(slot) + offset - time.monotonic()
+            if remaining <= 0:
+                return slot
+            await asyncio.sleep(remaining if remaining < 0.05 else remaining / 2)
+
+    def leader(self, slot=None):
+        """Identity of the leader of `slot`, by default the slot `lookahead` ahead of the current one."""
+        if self.leader_schedule is None:
+            return None
+        return self.leader_schedule.leader(slot if slot is not None else self.current_slot() + self.lookahead)
+
+    def upcoming_leaders(self, count=4):
+        """[(first slot, leader)] of the next `count` leader rotations, starting with the current one."""
+        first_slot = self.current_slot() // LEADER_SLOTS * LEADER_SLOTS
+        return [(slot, self.leader(slot)) for slot in range(first_slot, first_slot + count * LEADER_SLOTS, LEADER_SLOTS)]
+
+    def region(self, slot=None, regions=None):
+        """
+        Region closest to the leader of `slot`.
+
+        Args:
+            slot (int): Defaults to the slot `lookahead` ahead of the current one
+            regions (list): Only return one of these regions
+
+        Returns:
+            str: Region, None if the leader or its region is unknown
+        """
+        region = self.leader_regions.get(self.leader(slot))
+        if regions is not None and region not in regions:
+            return None
+        return region
+
+
+async def simulate(offset, count, jitter, delay, drop_rate):
+    """
+    Hold `count` times until `offset` into a slot of a SimulatedSlotFeed and measure the error.
+
+    Returns:
+        Histogram: Absolute alignment error of every wait in microseconds
+    """
+    feed = SimulatedSlotFeed(start_slot=1000, delay=delay, jitter=jitter, drop_rate=drop_rate, seed=1)
+    errors = Histogram()
+    async with SlotClock(feed) as clock:
+        # Let the fit collect a few slots first
+        await clock.wait(0.0, clock.slot + 8)
+        for _ in range(count):
+            slot = await clock.wait(offset)
+            errors.record(int(abs(time.monotonic() - (feed.slot_start(slot) + offset)) * 1e6))
+        print(f"slot duration {clock.slot_duration * 1e3:.2f}ms (true {feed.slot_duration * 1e3:.2f}ms)")
+    summary = errors.summary()
+    print("alignment error (us): " + " ".join(f"{key} {summary[key]:.0f}" for key in ["p50", "p90", "p99", "max"]))
+    return errors
+
+
+async def watch(rpc_url, leader_regions):
+    async with SlotClock(RpcSlotFeed(rpc_url), LeaderSchedule(rpc_url), leader_regions) as clock:
+        while True:
+            await clock.wait(0.0)
+            leaders = ", ".join(f"{slot}: {leader} ({leader_regions.get(leader, '-')})"
+                                for slot, leader in clock.upcoming_leaders())
+            print(f"slot {clock.current_slot()} duration {clock.slot_duration * 1e3:.1f}ms leaders {leaders}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Follow the cluster's slots and leaders")
+    parser.add_argument("--rpc_url", default="https://api.mainnet-beta.solana.com", help="RPC endpoint.")
+    parser.add_argument("--leader_regions", help="JSON file mapping validator identities to regions.")
+    parser.add_argument("--simulate", action="store_true", help="Measure the timing against a simulated slot feed.")
+    parser.add_argument("--offset", type=float, default=-0.05, help="Seconds relative to the slot start to wake up at.")
+    parser.add_argument("--count", type=int, default=50, help="Number of simulated waits.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Simulated reporting jitter in seconds.")
+    parser.add_argument("--delay", type=float, default=0.01, help="Simulated reporting delay in seconds.")
+    parser.add_argument("--drop_rate", type=float, default=0.1, help="Share of simulated updates dropped.")
+    parser.add_argument("--max_error_ms", type=float, default=15.0,
+                        help="Exit with code 1 if the simulated p99 alignment error is above this bound.")
+    args = parser.parse_args()
+
+    if args.simulate:
+        errors = await simulate(args.offset, args.count, args.jitter, args.delay, args.drop_rate)
+        p99 = errors.percentile(99) / 1e3
+        if p99 > args.max_error_ms:
+            print(f"Alignment error p99 {p99:.2f}ms is above {args.max_error_ms}ms")
+            sys.exit(1)
+        return
+    leader_regions = {}
+    if args.leader_regions:
+        with open(args.leader_regions) as f:
+            leader_regions = json.load(f)
+    await watch(args.rpc_url, leader_regions)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+import struct
+from solders.hash import Hash
+from solders.message import Message
+from solders.system_program import ID as SYSTEM_PROGRAM_ID, TransferParams, transfer
+
+"""
+Precompiled transaction template
+
+Building a transaction the way main.py does (Pubkey.from_string, transfer(TransferParams(...)),
+Message.new_with_blockhash, Transaction.new_unsigned, sign) allocates a lot of Python objects, and
+nearly all of it is identical between two sends of the same strategy.
+
+TransactionTemplate compiles the message once and keeps the serialized transaction in a bytearray:
+    compact-u16 signature count (1) | signature (64 bytes) | message
+The message layout is fixed, so the recent blockhash, the lamports of every system transfer and the
+transfer recipients sit at known byte offsets. Sending again only patches those bytes in place and
+signs the message with ed25519, which takes microseconds.
+
+Usage:
+```
+template = TransactionTemplate.transfer(sender, receiver, tip_receiver, lamports=1, tip_lamports=1000000)
+transaction_bytes = template.render(latest_blockhash.blockhash)
+transaction_bytes = template.render(latest_blockhash.blockhash, lamports=[5, 1000000])
+```
+"""
+
+SYSTEM_TRANSFER = 2
+SIGNATURE_LENGTH = 64
+PUBKEY_LENGTH = 32
+
+
+def read_compact_u16(data, offset):
+    """
+    Decodes a Solana compact-u16 (shortvec) length.
+
+    Returns:
+        tuple: (value, offset after the encoded value)
+    """
+    value = 0
+    for shift in (0, 7, 14):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+    return value, offset
+
+
+class TransactionTemplate:
+    """
+    Serialized single-signer legacy transaction with patchable fields.
+
+    Args:
+        message (Message): Compiled message, its payer must be the only required signature
+        signer (Keypair): Keypair of the payer
+
+    Attributes:
+        transfers (list): (lamports offset, recipient key offset) of every system transfer, in instruction order
+        key_uses (list): Number of instruction references (program or account) of every account key
+    """
+
+    def __init__(self, message, signer):
+        if message.header.num_required_signatures != 1:
+            raise ValueError("TransactionTemplate supports a single signer only")
+        self.signer = signer
+        message_bytes = bytes(message)
+        # One signature: compact-u16 count 0x01 followed by the 64 byte signature
+        self.message_offset = 1 + SIGNATURE_LENGTH
+        self.buffer = bytearray(b"\x01" + bytes(SIGNATURE_LENGTH) + message_bytes)
+        self.transfers = []
+
+        # Walk the message: header (3 bytes), account keys, recent blockhash, instructions
+        data = memoryview(message_bytes)
+        num_keys, offset = read_compact_u16(data, 3)
+        self.keys_offset = offset
+        self.key_count = num_keys
+        keys = [bytes(data[offset + i * PUBKEY_LENGTH:offset + (i + 1) * PUBKEY_LENGTH]) for i in range(num_keys)]
+        offset += num_keys * PUBKEY_LENGTH
+        self.blockhash_offset = offset
+        offset += PUBKEY_LENGTH
+        num_instructions, offset = read_compact_u16(data, offset)
+        system_program = bytes(SYSTEM_PROGRAM_ID)
+        self.key_uses = [0] * num_keys
+        for _ in range(num_instructions):
+            program_index = data[offset]
+            num_accounts, offset = read_compact_u16(data, offset + 1)
+            accounts = data[offset:offset + num_accounts]
+            self.key_uses[program_index] += 1
+            for account in accounts:
+                self.key_uses[account] += 1
+            offset += num_accounts
+            data_length, offset = read_compact_u16(data, offset)
+            if (keys[program_index] == system_program and data_length == 12
+                    and struct.unpack_from("<I", data, offset)[0] == SYSTEM_TRANSFER):
+                recipient_offset = self.keys_offset + accounts[1] * PUBKEY_LENGTH
+                self.transfers.append((self.message_offset + offset + 4, self.message_offset + recipient_offset))
+            offset += data_length
+        self.blockhash_offset += self.message_offset
+        self.keys_offset += self.message_offset
+
+    @classmethod
+    def transfer(cls, sender, receiver, tip_receiver, lamports=1, tip_lamports=1000000):
+        """
+        Template of the main transfer plus tip transfer sent by main.py.
+
+        Args:
+            sender (Keypair): Payer and signer
+            receiver (Pubkey): Receiver of the main transfer
+            tip_receiver (Pubkey): One of the 0slot.trade tip accounts
+            lamports (int): Amount of the main transfer
+            tip_lamports (int): Tip amount, at least 0.001 SOL
+        """
+        instructions = [
+            transfer(TransferParams(from_pubkey=sender.pubkey(), to_pubkey=receiver, lamports=lamports)),
+            transfer(TransferParams(from_pubkey=sender.pubkey(), to_pubkey=tip_receiver, lamports=tip_lamports)),
+        ]
+        return cls(Message.new_with_blockhash(instructions, sender.pubkey(), Hash.default()), signer=sender)
+
+    def set_blockhash(self, blockhash):
+        self.buffer[self.blockhash_offset:self.blockhash_offset + PUBKEY_LENGTH] = bytes(blockhash)
+
+    def set_lamports(self, index, lamports):
+        """Set the amount of the `index`-th system transfer."""
+        struct.pack_into("<Q", self.buffer, self.transfers[index][0], lamports)
+
+    def set_recipient(self, index, recipient):
+        """
+        Set the recipient of the `index`-th system transfer.
+
+        The recipient replaces the account key in place, in the key table shared by all instructions. The
+        current recipient must therefore be used by this transfer only, and the new one must not be any other
+        account of the message (e.g. the payer), otherwise the account list would contain a duplicate.
+
+        Raises:
+            ValueError: The current recipient is used elsewhere in the message, or the new one already is
+        """
+        key = bytes(recipient)
+        offset = self.transfers[index][1]
+        key_index = (offset - self.keys_offset) // PUBKEY_LENGTH
+        if self.key_uses[key_index] > 1:
+            raise ValueError(f"The recipient of transfer {index} is account {key_index}, which other instructions "
+                             f"use too, patching it would change them as well")
+        for i in range(self.key_count):
+            start = self.keys_offset + i * PUBKEY_LENGTH
+            if start != offset and self.buffer[start:start + PUBKEY_LENGTH] == key:
+                raise ValueError(f"{recipient} is already account {i} of the message")
+        self.buffer[offset:offset + PUBKEY_LENGTH] = key
+
+    def sign(self):
+        """
+        Sign the current message.
+
+        Returns:
+            bytes: The serialized signed transaction, ready for send_transaction / send_binary
+        """
+        signature = self.signer.sign_message(bytes(memoryview(self.buffer)[self.message_offset:]))
+        self.buffer[1:self.message_offset] = bytes(signature)
+        return bytes(self.buffer)
+
+    def render(self, blockhash, lamports=None, recipients=None):
+        """
+        Patch the blockhash and optionally the transfer amounts / recipients, then sign.
+
+        Args:
+            blockhash (Hash): Recent blockhash
+            lamports (list): New amount per system transfer, None entries are kept
+            recipients (list): New recipient per system transfer, None entries are kept
+
+        Returns:
+            bytes: The serialized signed transaction
+        """
+        self.set_blockhash(blockhash)
+        for index, value in enumerate(lamports or ()):
+            if value is not None:
+                self.set_lamports(index, value)
+        for index, value in enumerate(recipients or ()):
+            if value is not None:
+                self.set_recipient(index, value)
+        return self.sign()
@@ -1,13 +1,14 @@
 import time
-import base58
 import asyncio
 import argparse
-from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 from solders.transaction import Transaction
 from solders.message import Message
 from solders.system_program import TransferParams, transfer
-from solana.rpc.async_api import AsyncClient
+from blockhash import BlockhashCache
+from sender import Sender
+from signer import SignerRegistry
+from tips import MIN_TIP_LAMPORTS, tip_instruction, tip_pubkey
 
 """
 HTTP Keep-Alive Explained
@@ -60,50 +61,45 @@ client.getApi().getHealth()
 
 rust solana sdk is
 rpcClient.get_health()
+
+python sender in this directory is
+Sender.heartbeat(), which performs the GET without the api-key. Sender.start() keeps calling it every 60 seconds in the background.
 """
 
-async def send_solana_transaction(api_key, private_key, tip_key, to_public_key, keep):
-    client_for_blockhash = AsyncClient(f"https://api.mainnet-beta.solana.com")
+# The keypair is decoded once, the second send reuses it.
+SIGNERS = SignerRegistry()
+
+async def send_solana_transaction(client_for_blockhash, api_key, private_key, tip_key, to_public_key, keep):
     # prioritize using the ones provided by the sales team, as HTTP is more efficient than HTTPS
-    client_for_send = AsyncClient(f"https://de.0slot.trade?api-key=" + api_key)
+    client_for_send = Sender(api_key, regions=["de"])
 
-    latest_blockhash = await client_for_blockhash.get_latest_blockhash()
-    await client_for_blockhash.close()
+    # Served from the background cache, no RPC round-trip before building the transaction
+    latest_blockhash = client_for_blockhash.get()
 
-    sender = Keypair.from_bytes(base58.b58decode(private_key))
+    # Decoded once, later sends reuse the Keypair (see signer.py)
+    sender = SIGNERS.load(private_key)
     receiver = Pubkey.from_string(to_public_key)
-    tip_receiver = Pubkey.from_string(tip_key)
+    tip_receiver = tip_pubkey(tip_key)
 
     main_transfer_instruction = transfer(TransferParams(from_pubkey = sender.pubkey(), to_pubkey = receiver, lamports = 1))
-    # You need to transfer an amount greater than or equal to 0.001 SOL to any of the following accounts:
-    # 6fQaVhYZA4w3MBSXjJ81Vf6W1EDYeUPXpgVQ6UQyU1Av
-    # 4HiwLEP2Bzqj3hM2ENxJuzhcPCdsafwiet3oGkMkuQY4
-    # 7toBU3inhmrARGngC7z6SjyP85HgGMmCTEwGNRAcYnEK
-    # 8mR3wB1nh4D6J9RUCugxUpc6ya8w38LPxZ3ZjcBhgzws
-    # 6SiVU5WEwqfFapRuYCndomztEwDjvS5xgtEof3PLEGm9
-    # TpdxgNJBWZRL8UXF5mrEsyWxDWx9HQexA9P1eTWQ42p
-    # D8f3WkQu6dCF33cZxuAsrKHrGsqGP2yvAHf8mX6RXnwf
-    # GQPFicsy3P3NXxB5piJohoxACqTvWE9fKpLgdsMduoHE
-    # Ey2JEr8hDkgN8qKJGrLf2yFjRhW7rab99HVxwi5rcvJE
-    # 4iUgjMT8q2hNZnLuhpqZ1QtiV8deFPy2ajvvjEpKKgsS
-    # 3Rz8uD83QsU8wKvZbgWAPvCNDU6Fy8TSZTMcPm3RB6zt
-    tip_transfer_instruction = transfer(TransferParams(from_pubkey = sender.pubkey(), to_pubkey = tip_receiver, lamports = 1000000))
-    message = Message.new_with_blockhash([main_transfer_instruction, tip_transfer_instruction], payer=sender.pubkey(), blockhash=latest_blockhash.value.blockhash)
+    # You need to transfer an amount greater than or equal to 0.001 SOL to any of the tip accounts in tips.py.
+    tip_transfer_instruction = tip_instruction(sender.pubkey(), tip_receiver, MIN_TIP_LAMPORTS)
+    message = Message.new_with_blockhash([main_transfer_instruction, tip_transfer_instruction], payer=sender.pubkey(), blockhash=latest_blockhash.blockhash)
     transaction = Transaction.new_unsigned(message)
-    transaction.sign([sender], latest_blockhash.value.blockhash)
+    transaction.sign([sender], latest_blockhash.blockhash)
 
     try:
         """
-        Here, for 'keep', after simulating multiple requests, the connection is maintained. It is recommended to execute client_for_send.is_connected() every 60 seconds. Note that executing client_for_send.is_connected() will also consume TPS.
+        Here, for 'keep', after simulating multiple requests, the connection is maintained. It is recommended to execute client_for_send.heartbeat() every 60 seconds. It omits the api-key, so it does not consume TPS.
         """
         if keep:
-            await client_for_send.is_connected()
+            await client_for_send.heartbeat()
         start_time = time.perf_counter()
-        result = await client_for_send.send_transaction(transaction)
+        signature = await client_for_send.send_transaction(transaction)
         end_time = time.perf_counter()
         elapsed_time = end_time - start_time
         print(f"Transaction sent successfully in {elapsed_time:.4f} seconds")
-        print("Transaction signature:", result.value)
+        print("Transaction signature:", signature)
     except Exception as e:
         print("Error:", str(e))
     finally:
@@ -117,8 +113,9 @@ async def main():
     parser.add_argument("--to_public_key", required=True, help="Public key of the main receiver.")
     args = parser.parse_args()
 
-    await send_solana_transaction(args.api_key, args.private_key, args.tip_key, args.to_public_key, False)
-    await send_solana_transaction(args.api_key, args.private_key, args.tip_key, args.to_public_key, True)
+    async with BlockhashCache() as client_for_blockhash:
+        await send_solana_transaction(client_for_blockhash, args.api_key, args.private_key, args.tip_key, args.to_public_key, False)
+        await send_solana_transaction(client_for_blockhash, args.api_key, args.private_key, args.tip_key, args.to_public_key, True)
 
 if __name__ == "__main__":
     asyncio.run(main())
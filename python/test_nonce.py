@@ -1,133 +1,73 @@
-import base58
 import asyncio
 import argparse
-from solders.hash import Hash
 from solders.pubkey import Pubkey
-from solders.keypair import Keypair
-from solders.message import Message
-from solders.transaction import Transaction
 from solders.system_program import TransferParams, transfer
-from solana.rpc.async_api import AsyncClient
+from nonce_pool import NoncePool
+from fanout import FanOut
+from sender import Sender, REGIONS
+from signer import SignerRegistry
 
-async def send_solana_transaction(api_key, private_key, nonce_public_key, to_public_key):
-    # Initialize clients for different regions
-    client_for_blockhash = AsyncClient(f"https://api.mainnet-beta.solana.com")
-    # prioritize using the ones provided by the sales team, as HTTP is more efficient than HTTPS
-    de_sender = AsyncClient(f"https://de.0slot.trade?api-key=" + api_key)  # Germany endpoint
-    ny_sender = AsyncClient(f"https://ny.0slot.trade?api-key=" + api_key)  # New York endpoint
+# Keypairs decoded once per process.
+SIGNERS = SignerRegistry()
+
+async def send_solana_transaction(api_key, private_key, nonce_public_key, to_public_key, regions):
+    # One warm sender connected to every region, see sender.py
+    client_for_send = Sender(api_key, regions=regions)
 
     # Create keypair from private key
-    sender = Keypair.from_bytes(base58.b58decode(private_key))
+    # Decoded once, later sends reuse the Keypair (see signer.py)
+    sender = SIGNERS.load(private_key)
 
     # Main recipient address
     receiver = Pubkey.from_string(to_public_key)
-    # Our TIP receiving addresses - using different addresses for DE and NY to simulate multiple Landing Services
-    de_tip_receiver = Pubkey.from_string("6fQaVhYZA4w3MBSXjJ81Vf6W1EDYeUPXpgVQ6UQyU1Av")
-    ny_tip_receiver = Pubkey.from_string("4HiwLEP2Bzqj3hM2ENxJuzhcPCdsafwiet3oGkMkuQY4")
     # Nonce account public key created by sender - must be associated
     # solana-keygen new -o nonce-account.json
     # solana -k sender.json create-nonce-account nonce-account.json 0.0015
-    nonce_account_pubkey = Pubkey.from_string(nonce_public_key)
-
-    # Get nonce account info to extract the current nonce value
-    get_account_resp = await client_for_blockhash.get_account_info(nonce_account_pubkey)
-    await client_for_blockhash.close()
+    # The pool reads the nonce account and caches its current nonce value (see nonce_pool.py),
+    # pass more nonce accounts to run independent nonce-protected sends in parallel.
+    nonce_pool = NoncePool([nonce_public_key])
 
-    # The nonce is stored in the account data at bytes 40-72
-    # This matches the Rust NonceState structure layout:
-    # struct NonceState {
-    #     version: u32,          // 4 bytes (offset 0-3)
-    #     state: u32,            // 4 bytes (offset 4-7)
-    #     authorized_pubkey: Pubkey,  // 32 bytes (offset 8-39)
-    #     nonce: Pubkey,         // 32 bytes (offset 40-71) ← we need this
-    #     fee_calculator: FeeCalculator,  // 8 bytes (offset 72-79)
-    # }
-    nonce = get_account_resp.value.data[40:72]
-    nonce_hash = Hash.from_bytes(nonce)
+    # Read the nonce account while the send connections are being opened
+    await asyncio.gather(
+        nonce_pool.start(),
+        client_for_send.start(),
+    )
+    nonce_account = await nonce_pool.acquire()
 
-    # Create transaction instructions for Germany endpoint
-    # Includes:
-    # 1. Main transfer (1 lamport)
-    # 2. Tip transfer (1,000,000 lamports = 0.001 SOL)
-    de_instructions = [
-        transfer(
-            TransferParams(
-                from_pubkey=sender.pubkey(),
-                to_pubkey=receiver,
-                lamports=1
-            )
-        ),
-        transfer(
-            TransferParams(
-                from_pubkey=sender.pubkey(),
-                to_pubkey=de_tip_receiver,
-                lamports=1000000
-            )
-        )
-    ]
-    
-    # Create transaction instructions for New York endpoint (same structure)
-    ny_instructions = [
+    # Main transfer (1 lamport), shared by every region.
+    # FanOut appends the tip transfer (1,000,000 lamports = 0.001 SOL) with a different TIP receiving
+    # address per region to simulate multiple Landing Services.
+    instructions = [
         transfer(
             TransferParams(
                 from_pubkey=sender.pubkey(),
                 to_pubkey=receiver,
                 lamports=1
             )
-        ),
-        transfer(
-            TransferParams(
-                from_pubkey=sender.pubkey(),
-                to_pubkey=ny_tip_receiver,
-                lamports=100000
-            )
         )
     ]
-    
-    # Create messages with nonce for each transaction
-    de_message = Message.new_with_nonce(
-        de_instructions,
-        payer=sender.pubkey(),
-        nonce_account_pubkey=nonce_account_pubkey,
-        nonce_authority_pubkey=sender.pubkey(),
-    )
-    ny_message = Message.new_with_nonce(
-        ny_instructions,
-        payer=sender.pubkey(),
-        nonce_account_pubkey=nonce_account_pubkey,
-        nonce_authority_pubkey=sender.pubkey(),
-    )
 
-    # Create unsigned transactions
-    de_transaction = Transaction.new_unsigned(de_message)
-    ny_transaction = Transaction.new_unsigned(ny_message)
-
-    # Sign transactions with the same nonce
-    de_transaction.sign([sender], nonce_hash)
-    ny_transaction.sign([sender], nonce_hash)
+    # Create and sign one transaction per region with the same nonce
+    fan_out = FanOut(client_for_send, nonce_account.pubkey, signers=SIGNERS)
+    transactions = await fan_out.build(sender, instructions, nonce_account.nonce, regions)
 
     try:
-        # Send both transactions concurrently using asyncio
-        de_task = de_sender.send_transaction(de_transaction)
-        ny_task = ny_sender.send_transaction(ny_transaction)
-        results = await asyncio.gather(
-            de_task,
-            ny_task,
-            return_exceptions=True  # Don't fail if one transaction fails
-        )
-        
-        # Process results
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                print(f"Error sending to {'DE' if i == 0 else 'NY'}: {str(result)}")
+        # Send all transactions concurrently, only the first one to land can advance the nonce
+        results = await fan_out.send(transactions)
+
+        # Process results, fastest acceptance first
+        for result in results:
+            if result.error is not None:
+                print(f"Error sending to {result.region.upper()}: {str(result.error)}")
             else:
-                print(f"Transaction signature ({'DE' if i == 0 else 'NY'}):", result.value)
+                print(f"Transaction signature ({result.region.upper()}, {result.latency:.4f}s):", result.signature)
     except Exception as e:
         print("Error:", str(e))
     finally:
         # Clean up connections
-        await de_sender.close()
-        await ny_sender.close()
+        nonce_pool.release(nonce_account)
+        await nonce_pool.close()
+        await client_for_send.close()
 
 async def main():
     # Set up command line argument parser
@@ -136,6 +76,7 @@ async def main():
     parser.add_argument("--private_key", required=True, help="Sender's private key for signing the transaction.")
     parser.add_argument("--nonce_public_key", required=True, help="Sender's nonce account public key")
     parser.add_argument("--to_public_key", required=True, help="Public key of the main receiver.")
+    parser.add_argument("--regions", default="de,ny", help=f"Comma-separated regions to send to, any of: {','.join(REGIONS)}")
 
     args = parser.parse_args()
 
@@ -144,6 +85,7 @@ async def main():
         args.private_key,
         args.nonce_public_key,
         args.to_public_key,
+        args.regions.split(","),
     )
 
 if __name__ == "__main__":
@@ -1,159 +1,232 @@
-import requests
+import asyncio
+import argparse
+import json
+import socket
+import ssl
+import sys
 import time
-import numpy as np
+from urllib.parse import urlsplit
+from histogram import Histogram
+from sender import REGIONS
 
 """
 ### How to Choose a Node  ###
-We provide nodes in three locations: Frankfurt, New York, and Amsterdam. It is recommended to select the node closest to your location.
+We provide nodes in New York, Frankfurt, Amsterdam, Tokyo and Los Angeles. It is recommended to select the node closest to your location.
 
 ### test script ###
-This test script measures the maximum latency, minimum latency, average latency, and latency from the 10th to the 90th percentile during multiple access attempts. It helps you make an informed decision.  
+This test script probes every node concurrently and splits each request into its phases:
+- dns: resolving the host name
+- connect: TCP connect
+- tls: TLS handshake (https only)
+- ttfb: time from writing the request to the first byte of the response
 
-Direct Installation:  
-```
-pip install requests numpy  
-```
+Times are measured with time.perf_counter_ns and recorded in an HDR-style histogram (see histogram.py),
+so the tail (p99, p99.9, max) is reported accurately. The probe is a GET without the api-key, which does
+not count toward TPS.
+
+By default a connection is opened once per node and reused with Keep-Alive, like a warm sender. Use
+--cold to open a new connection for every request and measure dns / connect / tls each time.
 
-After successful installation, you can run the test:  
+After installing requirements.txt, you can run the test:
 ```
-python test_speed.py  
+python test_speed.py
+python test_speed.py --requests 1000 --output run.json
+python test_speed.py --url de=http://de1.0slot.trade --url ny=http://ny1.0slot.trade
+python test_speed.py --baseline run.json --threshold 20
 ```
 
 It will output
 ```
-Testing de_domain_url...
-Successful requests: 1000/1000
-Average time: 0.281030 seconds
-Minimum time: 0.211010 seconds
-Maximum time: 0.784061 seconds
-10% percentile: 0.271020 seconds
-20% percentile: 0.271345 seconds
-30% percentile: 0.271595 seconds
-40% percentile: 0.271856 seconds
-50% percentile: 0.272114 seconds
-60% percentile: 0.272448 seconds
-70% percentile: 0.273095 seconds
-80% percentile: 0.274257 seconds
-90% percentile: 0.278987 seconds
-Testing ny_domain_url...
-Successful requests: 1000/1000
-Average time: 0.289061 seconds
-Minimum time: 0.253208 seconds
-Maximum time: 1.742639 seconds
-10% percentile: 0.254997 seconds
-20% percentile: 0.258541 seconds
-30% percentile: 0.265235 seconds
-40% percentile: 0.272321 seconds
-50% percentile: 0.278904 seconds
-60% percentile: 0.287030 seconds
-70% percentile: 0.294940 seconds
-80% percentile: 0.302580 seconds
-90% percentile: 0.307574 seconds
-Testing ams_domain_url...
-Successful requests: 1000/1000
-Average time: 0.203582 seconds
-Minimum time: 0.196838 seconds
-Maximum time: 0.515168 seconds
-10% percentile: 0.197338 seconds
-20% percentile: 0.197577 seconds
-30% percentile: 0.197782 seconds
-40% percentile: 0.198032 seconds
-50% percentile: 0.198368 seconds
-60% percentile: 0.198760 seconds
-70% percentile: 0.199504 seconds
-80% percentile: 0.201145 seconds
-90% percentile: 0.207533 seconds
+de  https://de.0slot.trade  1000/1000 ok
+  phase       count      min     mean      p50      p90      p99    p99.9      max  (ms)
+  dns             1    1.204    1.204    1.204    1.204    1.204    1.204    1.204
+  connect         1    0.512    0.512    0.512    0.512    0.512    0.512    0.512
+  tls             1    2.130    2.130    2.130    2.130    2.130    2.130    2.130
+  ttfb         1000    0.803    0.861    0.847    0.905    1.191    1.870    2.414
 ```
 
-Simply choose the node with the lowest latency as your sending node.If the latency exceeds 20ms, it is recommended to set up a machine near the node and test again.
+Simply choose the node with the lowest ttfb as your sending node.If the latency exceeds 20ms, it is recommended to set up a machine near the node and test again.
+To keep choosing the best node automatically while sending, use RegionRouter from router.py.
+--output writes the histograms as JSON so runs can be compared over time. With --baseline, every p50 / p99
+that got slower than the baseline by more than --threshold percent is reported and the exit code is 1.
 """
 
-def test_url(url, num_requests):
+PHASES = ["dns", "connect", "tls", "ttfb"]
+
+
+class Probe:
     """
-    Tests the performance of a URL by making multiple HTTP requests.
-    
+    Times requests to one node over a raw asyncio connection.
+
     Args:
-        url (str): The URL to be tested
-        num_requests (int): Number of requests to make
-        
-    Returns:
-        tuple: (average_time, min_time, max_time, percentiles) if successful
-               (None, None, None, None) if no successful requests
+        region (str): Name of the node
+        url (str): Base URL of the node (http or https)
     """
-    # Create a session object for connection pooling
-    session = requests.Session()
-    
-    # Initialize performance metrics
-    total_time = 0
-    successful_requests = 0
-    min_time = float('inf')  # Initialize with infinity
-    max_time = 0 
-    times = []  # List to store all response times
-    
-    # Make multiple requests to test performance
-    for _ in range(num_requests):
+
+    def __init__(self, region, url):
+        parts = urlsplit(url)
+        self.region = region
+        self.url = url
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.path = parts.path or "/"
+        self.request_bytes = (f"GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                              f"Connection: keep-alive\r\n\r\n").encode()
+        self.ssl_context = ssl.create_default_context() if self.tls else None
+        self.histograms = {phase: Histogram() for phase in PHASES}
+        self.successful = 0
+        self.failed = 0
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+
+        start = time.perf_counter_ns()
+        addresses = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter_ns()
+        self.histograms["dns"].record(resolved - start)
+
+        family, _, _, _, address = addresses[0]
+        self.reader, self.writer = await asyncio.open_connection(address[0], address[1], family=family)
+        connected = time.perf_counter_ns()
+        self.histograms["connect"].record(connected - resolved)
+
+        if self.tls:
+            await self.writer.start_tls(self.ssl_context, server_hostname=self.host)
+            self.histograms["tls"].record(time.perf_counter_ns() - connected)
+
+    def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _read_response(self):
+        # Minimal HTTP/1.1 response reader, enough to keep the connection reusable
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        headers = head.decode("latin-1").lower()
+        keep_alive = "connection: close" not in headers
+        if "transfer-encoding: chunked" in headers:
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            for line in headers.split("\r\n"):
+                if line.startswith("content-length:"):
+                    await self.reader.readexactly(int(line.split(":", 1)[1]))
+                    break
+            else:
+                keep_alive = False
+        return keep_alive
+
+    async def request(self, cold):
         try:
-            # Record start time before making request
-            start_time = time.time()
-            
-            # Make GET request to the URL
-            response = session.get(url)
-            
-            # Record end time after receiving response
-            end_time = time.time()
-            
-            # Calculate elapsed time for this request
-            elapsed_time = end_time - start_time
-            
-            # Update metrics
-            total_time += elapsed_time
-            successful_requests += 1
-            times.append(elapsed_time)
-
-            # Update min and max times
-            if elapsed_time < min_time:
-                min_time = elapsed_time
-            if elapsed_time > max_time:
-                max_time = elapsed_time
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-
-    # Calculate and display statistics if we had successful requests
-    if successful_requests > 0:
-        # Calculate average response time
-        avg_time = total_time / successful_requests
-        
-        # Print basic statistics
-        print(f"Successful requests: {successful_requests}/{num_requests}")
-        print(f"Average time: {avg_time:.6f} seconds")
-        print(f"Minimum time: {min_time:.6f} seconds")
-        print(f"Maximum time: {max_time:.6f} seconds")
-
-        # Calculate various percentiles (10% to 90%)
-        percentiles = np.percentile(times, [10, 20, 30, 40, 50, 60, 70, 80, 90])
-        
-        # Print percentile information
-        for i, percentile in enumerate(percentiles):
-            print(f"{10 * (i + 1)}% percentile: {percentile:.6f} seconds")
-
-        return avg_time, min_time, max_time, percentiles
-    else:
-        print("No successful requests.")
-        return None, None, None, None
-
-# Number of requests to be made for testing
-num_requests = 1000
-# prioritize using the ones provided by the sales team, as HTTP is more efficient than HTTPS
-de_domain_url = "http://de1.0slot.trade/?api-key=xxx"
-ny_domain_url = "http://ny1.0slot.trade/?api-key=xxx"
-ams_domain_url = "http://ams1.0slot.trade/?api-key=xxx"
-
-print("Testing de_domain_speed...")
-test_url(de_domain_url, num_requests)
-
-print("Testing ny_domain_speed...")
-test_url(ny_domain_url, num_requests)
-
-print("Testing ams_domain_speed...")
-test_url(ams_domain_url, num_requests)
\ No newline at end of file
+            if cold or self.writer is None:
+                self.disconnect()
+                await self.connect()
+            start = time.perf_counter_ns()
+            self.writer.write(self.request_bytes)
+            await self.writer.drain()
+            await self.reader.readexactly(1)
+            self.histograms["ttfb"].record(time.perf_counter_ns() - start)
+            keep_alive = await self._read_response()
+            self.successful += 1
+            if cold or not keep_alive:
+                self.disconnect()
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+            self.failed += 1
+            self.disconnect()
+            print(f"Request to {self.region} failed: {e!r}")
+
+    async def run(self, num_requests, cold, interval):
+        for _ in range(num_requests):
+            await self.request(cold)
+            if interval:
+                await asyncio.sleep(interval)
+        self.disconnect()
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "successful": self.successful,
+            "failed": self.failed,
+            "histograms": {phase: histogram.to_dict() for phase, histogram in self.histograms.items()},
+        }
+
+
+def print_report(probe):
+    """
+    Prints the per-phase latency distribution of one node in milliseconds.
+    """
+    total = probe.successful + probe.failed
+    print(f"{probe.region:<4}{probe.url}  {probe.successful}/{total} ok")
+    print(f"  {'phase':<8}{'count':>9}{'min':>9}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'max':>9}  (ms)")
+    for phase in PHASES:
+        summary = probe.histograms[phase].summary()
+        if not summary["count"]:
+            continue
+        values = [summary[key] / 1e6 for key in ["min", "mean", "p50", "p90", "p99", "p99.9", "max"]]
+        print(f"  {phase:<8}{summary['count']:>9}" + "".join(f"{value:>9.3f}" for value in values))
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares p50 and p99 of every phase against a previous run.
+
+    Returns:
+        list: Human readable regressions, empty if none
+    """
+    regressions = []
+    for region, result in results.items():
+        previous = baseline.get("regions", {}).get(region)
+        if previous is None:
+            continue
+        for phase in PHASES:
+            current = Histogram.from_dict(result["histograms"][phase])
+            before = Histogram.from_dict(previous["histograms"][phase])
+            if not current.count or not before.count:
+                continue
+            for percentile in (50, 99):
+                now, then = current.percentile(percentile), before.percentile(percentile)
+                if then and (now - then) * 100 / then > threshold:
+                    regressions.append(f"{region} {phase} p{percentile}: {then / 1e6:.3f}ms -> {now / 1e6:.3f}ms")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure the latency of every 0slot.trade node")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of requests per node.")
+    parser.add_argument("--url", action="append", default=[], metavar="REGION=URL",
+                        help="Node to probe, e.g. de=http://de1.0slot.trade. Defaults to every region in sender.py.")
+    parser.add_argument("--cold", action="store_true", help="Open a new connection for every request.")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds to wait between requests to a node.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare against.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent.")
+    args = parser.parse_args()
+
+    urls = dict(url.split("=", 1) for url in args.url) if args.url else REGIONS
+    probes = [Probe(region, url) for region, url in urls.items()]
+    await asyncio.gather(*(probe.run(args.requests, args.cold, args.interval) for probe in probes))
+
+    for probe in probes:
+        print_report(probe)
+
+    results = {probe.region: probe.to_dict() for probe in probes}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": time.time(), "cold": args.cold, "regions": results}, f)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import itertools
+from functools import lru_cache
+from solders.pubkey import Pubkey
+from solders.system_program import TransferParams, transfer
+
+"""
+0slot.trade tip accounts
+
+Every sendTransaction needs a transfer of at least 0.001 SOL to one of the tip accounts below. They are
+decoded from base58 once at import, and tip_instruction() caches the ready-made transfer instruction per
+(payer, tip account, lamports), which takes the base58 decoding and the instruction allocation off the
+hot path.
+
+Spreading tips over all accounts also spreads the write lock of the tip account across transactions
+that land in the same block. The rotation policies pick the account of the next transaction:
+- RoundRobin: cycles through the accounts, separately per region
+- LeastRecentlyUsed: the account unused for the longest time across all regions
+
+Usage:
+```
+policy = RoundRobin()
+tip_transfer_instruction = tip_instruction(sender.pubkey(), policy.choose("de"))
+```
+"""
+
+TIP_ACCOUNTS = [
+    "6fQaVhYZA4w3MBSXjJ81Vf6W1EDYeUPXpgVQ6UQyU1Av",  # 0slot_dot_trade.sol
+    "4HiwLEP2Bzqj3hM2ENxJuzhcPCdsafwiet3oGkMkuQY4",  # 0slot_dot_trade_tip15.sol
+    "7toBU3inhmrARGngC7z6SjyP85HgGMmCTEwGNRAcYnEK",  # 0slot_dot_trade_tip16.sol
+    "8mR3wB1nh4D6J9RUCugxUpc6ya8w38LPxZ3ZjcBhgzws",  # 0slot_dot_trade_tip17.sol
+    "6SiVU5WEwqfFapRuYCndomztEwDjvS5xgtEof3PLEGm9",  # 0slot_dot_trade_tip18.sol
+    "TpdxgNJBWZRL8UXF5mrEsyWxDWx9HQexA9P1eTWQ42p",   # 0slot_dot_trade_tip19.sol
+    "D8f3WkQu6dCF33cZxuAsrKHrGsqGP2yvAHf8mX6RXnwf",  # 0slot_dot_trade_tip20.sol
+    "GQPFicsy3P3NXxB5piJohoxACqTvWE9fKpLgdsMduoHE",  # 0slot_dot_trade_tip21.sol
+    "Ey2JEr8hDkgN8qKJGrLf2yFjRhW7rab99HVxwi5rcvJE",  # 0slot_dot_trade_tip22.sol
+    "4iUgjMT8q2hNZnLuhpqZ1QtiV8deFPy2ajvvjEpKKgsS",  # 0slot_dot_trade_tip23.sol
+    "3Rz8uD83QsU8wKvZbgWAPvCNDU6Fy8TSZTMcPm3RB6zt",  # 0slot_dot_trade_tip24.sol
+]
+
+# Decoded once
+TIP_PUBKEYS = [Pubkey.from_string(account) for account in TIP_ACCOUNTS]
+_TIP_PUBKEYS_BY_NAME = dict(zip(TIP_ACCOUNTS, TIP_PUBKEYS))
+
+# 0.001 SOL, the minimum tip
+MIN_TIP_LAMPORTS = 1000000
+
+
+def tip_pubkey(account):
+    """Pubkey of a tip account given as base58 string or Pubkey, without decoding a known account again."""
+    if isinstance(account, Pubkey):
+        return account
+    pubkey = _TIP_PUBKEYS_BY_NAME.get(account)
+    return pubkey if pubkey is not None else Pubkey.from_string(account)
+
+
+@lru_cache(maxsize=4096)
+def tip_instruction(payer, tip_account, lamports=MIN_TIP_LAMPORTS):
+    """
+    Cached tip transfer instruction.
+
+    Args:
+        payer (Pubkey): Payer of the tip
+        tip_account (Pubkey): One of TIP_PUBKEYS
+        lamports (int): Tip amount, at least MIN_TIP_LAMPORTS
+
+    Returns:
+        Instruction: System transfer, shared between calls with the same arguments
+    """
+    if lamports < MIN_TIP_LAMPORTS:
+        raise ValueError(f"Tip of {lamports} lamports is below the minimum of {MIN_TIP_LAMPORTS}")
+    return transfer(TransferParams(from_pubkey=payer, to_pubkey=tip_account, lamports=lamports))
+
+
+class RoundRobin:
+    """
+    Cycles through the tip accounts, with an independent cycle per region.
+
+    Args:
+        accounts (list): Tip accounts to rotate over, defaults to TIP_PUBKEYS
+    """
+
+    def __init__(self, accounts=None):
+        self.accounts = [tip_pubkey(account) for account in (accounts or TIP_PUBKEYS)]
+        self._cycles = {}
+
+    def choose(self, region=None):
+        cycle = self._cycles.get(region)
+        if cycle is None:
+            # Start every region at a different account so parallel regions do not collide
+            offset = len(self._cycles) % len(self.accounts)
+            cycle = self._cycles[region] = itertools.cycle(self.accounts[offset:] + self.accounts[:offset])
+        return next(cycle)
+
+
+class LeastRecentlyUsed:
+    """
+    Picks the tip account that has not been used for the longest time in any region.
+
+    Args:
+        accounts (list): Tip accounts to rotate over, defaults to TIP_PUBKEYS
+    """
+
+    def __init__(self, accounts=None):
+        self.accounts = [tip_pubkey(account) for account in (accounts or TIP_PUBKEYS)]
+        # Shared by all regions: transactions of every region write-lock the same tip accounts.
+        # Recency is a pick counter, a coarse clock could give two picks the same time.
+        self._last_used = {account: 0 for account in self.accounts}
+        self._picks = itertools.count(1)
+
+    def choose(self, region=None):
+        account = min(self.accounts, key=self._last_used.__getitem__)
+        self._last_used[account] = next(self._picks)
+        return account
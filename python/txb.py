@@ -0,0 +1,394 @@
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from rate_limit import PRIORITY_NORMAL
+from sender import REGIONS, HEARTBEAT_INTERVAL, PACKET_DATA_SIZE, SendError
+
+"""
+Pipelined transport for /txb
+
+The /txb request is tiny: a fixed request line and headers around at most 1232 bytes of transaction.
+Through aiohttp every request still builds a request object, headers and a URL, and a connection carries
+only one request at a time, so concurrent sends need as many sockets as there are sends in flight.
+
+TxbTransport speaks HTTP/1.1 to one endpoint directly on asyncio transports:
+- a few persistent connections, opened up front and kept alive with the same heartbeat GET as the Sender
+- the request line and headers are rendered once; every send copies the Content-Length and the
+  transaction bytes into a preallocated per-connection buffer and writes it in one call
+- requests are pipelined: a send is written immediately on the least busy connection without waiting
+  for the responses before it, up to max_pipeline requests in flight per connection
+- every request has a future that completes as soon as its response is parsed, so the sends on
+  different connections complete in whatever order the responses arrive
+
+HTTP/1.1 answers the requests of one connection in order, a slow response delays the ones pipelined
+behind it on that socket; spreading them over `connections` sockets bounds that. HTTP/2 would multiplex
+without this ordering, it needs the h2 package and is not implemented here.
+
+If a connection closes with requests in flight their sends fail with ConnectionResetError; sending the
+same signed transaction again is safe, it cannot execute twice.
+
+Usage:
+```
+async with TxbTransport(api_key, region="de", connections=2) as transport:
+    results = await asyncio.gather(*(transport.send(transaction) for transaction in transactions))
+```
+"""
+
+# Requests written to a connection before the least busy one is considered full
+MAX_PIPELINE = 16
+
+
+class TxbProtocol(asyncio.Protocol):
+    """
+    One HTTP/1.1 connection with pipelined requests.
+
+    Responses are matched to requests by their order; every response resolves the oldest pending future
+    with (status, body).
+    """
+
+    def __init__(self):
+        self.transport = None
+        self.pending = deque()
+        self.closed = False
+        self._data = bytearray()
+        self._status = None
+        self._length = None
+        self._chunked = False
+        self._close = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.closed = True
+        if self._status is not None and self._length is None and not self._chunked and self.pending:
+            # Body delimited by the end of the connection
+            self._complete(bytes(self._data))
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionResetError(f"Connection closed: {exc}" if exc else "Connection closed"))
+
+    def request(self, data):
+        """Write one request, the returned future resolves with (status, body)."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(future)
+        self.transport.write(data)
+        return future
+
+    def _complete(self, body):
+        future = self.pending.popleft()
+        if not future.done():
+            future.set_result((self._status, body))
+        self._status = None
+        if self._close:
+            self.transport.close()
+
+    def data_received(self, data):
+        self._data += data
+        while self._parse():
+            pass
+
+    def _parse(self):
+        # One step of the response parser, True while there may be more to parse
+        data = self._data
+        if self._status is None:
+            end = data.find(b"\r\n\r\n")
+            if end < 0:
+                return False
+            lines = bytes(data[:end]).split(b"\r\n")
+            del data[:end + 4]
+            status = int(lines[0].split(b" ", 2)[1])
+            if status < 200:
+                # 100 Continue and friends precede the real response
+                return True
+            self._status, self._length, self._chunked, self._close = status, None, False, False
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == b"content-length":
+                    self._length = int(value)
+                elif name == b"transfer-encoding":
+                    self._chunked = b"chunked" in value
+                elif name == b"connection":
+                    self._close = value == b"close"
+            if not self.pending:
+                self.transport.close()
+                return False
+        if self._chunked:
+            body = self._chunked_body()
+            if body is None:
+                return False
+        elif self._length is not None:
+            if len(data) < self._length:
+                return False
+            body = bytes(data[:self._length])
+            del data[:self._length]
+        else:
+            return False
+        self._complete(body)
+        return bool(data)
+
+    def _chunked_body(self):
+        # Whole chunked body once every chunk and the trailer arrived, None before
+        data = self._data
+        chunks = []
+        position = 0
+        while True:
+            end = data.find(b"\r\n", position)
+            if end < 0:
+                return None
+            size = int(bytes(data[position:end]).split(b";", 1)[0], 16)
+            position = end + 2
+            if size == 0:
+                trailer = data.find(b"\r\n\r\n", position - 2)
+                if trailer < 0:
+                    return None
+                del data[:trailer + 4]
+                return b"".join(chunks)
+            if len(data) < position + size + 2:
+                return None
+            chunks.append(bytes(data[position:position + size]))
+            position += size + 2
+
+
+class TxbConnection:
+    """
+    Persistent connection writing /txb requests from a preallocated buffer.
+
+    Args:
+        protocol (TxbProtocol): The connected protocol
+        prefix (bytes): Request line and headers up to the Content-Length value
+    """
+
+    def __init__(self, protocol, prefix):
+        self.protocol = protocol
+        self._prefix_size = len(prefix)
+        self._buffer = bytearray(self._prefix_size + 16 + PACKET_DATA_SIZE)
+        self._buffer[:self._prefix_size] = prefix
+        self._view = memoryview(self._buffer)
+
+    @property
+    def closed(self):
+        return self.protocol.closed
+
+    @property
+    def in_flight(self):
+        return len(self.protocol.pending)
+
+    def send(self, transaction_bytes):
+        """Write one /txb request, the returned future resolves with (status, body)."""
+        length = b"%d\r\n\r\n" % len(transaction_bytes)
+        start = self._prefix_size + len(length)
+        end = start + len(transaction_bytes)
+        if end > len(self._buffer):
+            # Larger than a packet, the server will reject it, but let it say so
+            return self.protocol.request(bytes(self._buffer[:self._prefix_size]) + length + transaction_bytes)
+        self._buffer[self._prefix_size:start] = length
+        self._buffer[start:end] = transaction_bytes
+        future = self.protocol.request(self._view[:end])
+        if self.protocol.transport.get_write_buffer_size():
+            # The transport still holds part of this request, the next one gets a fresh buffer
+            prefix = bytes(self._buffer[:self._prefix_size])
+            self._buffer = bytearray(len(self._buffer))
+            self._buffer[:self._prefix_size] = prefix
+            self._view = memoryview(self._buffer)
+        return future
+
+    def request(self, data):
+        return self.protocol.request(data)
+
+    def close(self):
+        if self.protocol.transport is not None:
+            self.protocol.transport.close()
+
+    def abort(self):
+        if self.protocol.transport is not None:
+            self.protocol.transport.abort()
+
+
+class TxbTransport:
+    """
+    Pool of pipelined connections to the /txb endpoint of one region.
+
+    Args:
+        api_key (str): 0slot.trade api-key
+        region (str): Region from REGIONS
+        endpoint (str): Optional base URL override, e.g. the HTTP endpoint from the sales team
+        connections (int): Number of persistent connections
+        max_pipeline (int): Requests in flight per connection before another connection is opened
+        timeout (float): Seconds to wait for a response, the connection is dropped after a timeout
+        heartbeat_interval (float): Seconds between keep-alive GETs
+        rate_limiter (RateLimiter): Optional limiter every send waits on, see rate_limit.py
+        instrumentation (Instrumentation): Optional timing of http_write / ttfb (until the full response)
+        connection_layer (ConnectionLayer): Optional started layer providing the endpoint, cached DNS and
+            TLS session resumption, see connection.py
+        slot_clock (SlotClock): Optional started clock, a send with slot_offset is held until that point of the
+            next slot, see slots.py
+    """
+
+    def __init__(self, api_key, region="de", endpoint=None, connections=2, max_pipeline=MAX_PIPELINE,
+                 timeout=10, heartbeat_interval=HEARTBEAT_INTERVAL, rate_limiter=None, instrumentation=None,
+                 connection_layer=None, slot_clock=None):
+        if endpoint is None:
+            endpoint = (connection_layer.endpoints if connection_layer is not None else REGIONS)[region]
+        parts = urlsplit(endpoint)
+        self.api_key = api_key
+        self.region = region
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.connections = connections
+        self.max_pipeline = max_pipeline
+        self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.rate_limiter = rate_limiter
+        self.instrumentation = instrumentation
+        self.connection_layer = connection_layer
+        self.slot_clock = slot_clock
+        host = parts.netloc.encode()
+        self._prefix = (b"POST /txb?api-key=" + api_key.encode() + b" HTTP/1.1\r\nHost: " + host +
+                        b"\r\nContent-Type: application/octet-stream\r\nContent-Length: ")
+        self._ping = b"GET / HTTP/1.1\r\nHost: " + host + b"\r\n\r\n"
+        self._pool = []
+        self._connecting = None
+        self._heartbeat_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Open the connections and start the heartbeat."""
+        await asyncio.gather(*(self._open() for _ in range(self.connections - len(self._open_connections()))))
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for connection in self._pool:
+            connection.close()
+        self._pool.clear()
+
+    def _open_connections(self):
+        self._pool = [connection for connection in self._pool if not connection.closed]
+        return self._pool
+
+    async def _open(self):
+        loop = asyncio.get_running_loop()
+        host = self.host
+        ssl_context = None
+        if self.connection_layer is not None:
+            addresses = await self.connection_layer.resolver.resolve(self.host, self.port, self.connection_layer.family)
+            host = addresses[0]["host"]
+            ssl_context = self.connection_layer.ssl_context if self.tls else None
+        elif self.tls:
+            ssl_context = True
+        _, protocol = await loop.create_connection(TxbProtocol, host, self.port, ssl=ssl_context,
+                                                   server_hostname=self.host if self.tls else None)
+        connection = TxbConnection(protocol, self._prefix)
+        self._pool.append(connection)
+        return connection
+
+    def _opened(self, task):
+        self._connecting = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Connecting to {self.host} failed:", str(task.exception()))
+
+    async def _connection(self):
+        # Least busy open connection; opens another one in the background when it is full
+        pool = self._open_connections()
+        connection = min(pool, key=lambda connection: connection.in_flight, default=None)
+        if connection is not None and (connection.in_flight < self.max_pipeline or len(pool) >= self.connections):
+            return connection
+        if self._connecting is None:
+            self._connecting = asyncio.create_task(self._open())
+            self._connecting.add_done_callback(self._opened)
+        if connection is not None:
+            return connection
+        return await asyncio.shield(self._connecting)
+
+    def _report(self, status):
+        # Feed the outcome back into the adaptive backoff of the rate limiter
+        if self.rate_limiter is None:
+            return
+        if status == 419:
+            self.rate_limiter.on_rate_limited(self.api_key)
+        elif status == 200:
+            self.rate_limiter.on_success(self.api_key)
+
+    async def send(self, transaction, priority=PRIORITY_NORMAL, slot_offset=None):
+        """
+        Send a signed transaction as raw bytes to /txb.
+
+        Args:
+            transaction: Signed solders Transaction / VersionedTransaction or its serialized bytes
+            priority (int): Queue priority when a rate limiter is configured
+            slot_offset (float): With a slot_clock, hold the send until this many seconds after the start of
+                the next slot (negative: before it)
+
+        Returns:
+            str: Response body
+
+        Raises:
+            SendError: The server answered with a status other than 200
+            ConnectionResetError: The connection closed before the response arrived
+            asyncio.TimeoutError: No response within timeout
+        """
+        transaction_bytes = bytes(transaction)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self.api_key, priority)
+        if slot_offset is not None and self.slot_clock is not None:
+            # Held after the rate limiter released the send, only the write is left when the clock releases it
+            await self.slot_clock.wait(slot_offset)
+        request_start = time.perf_counter_ns()
+        connection = await self._connection()
+        future = connection.send(transaction_bytes)
+        written = time.perf_counter_ns()
+        try:
+            status, body = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # The responses behind a stalled one would all time out too, start over on a new socket
+            connection.abort()
+            raise
+        if self.instrumentation is not None:
+            self.instrumentation.record("http_write", written - request_start, region=self.region)
+            self.instrumentation.record("ttfb", time.perf_counter_ns() - written, region=self.region)
+        self._report(status)
+        if status != 200:
+            raise SendError(status, body.decode("utf-8", "replace"), self.region)
+        return body.decode("utf-8", "replace")
+
+    async def heartbeat(self):
+        """
+        Reopen closed connections and GET / on every connection, without the api-key it does not count toward TPS.
+
+        Returns:
+            list: HTTP status per connection, or the exception of a failed ping or reconnect
+        """
+        missing = self.connections - len(self._open_connections())
+        opened = await asyncio.gather(*(self._open() for _ in range(missing)), return_exceptions=True)
+        pings = [asyncio.wait_for(connection.request(self._ping), self.timeout) for connection in list(self._pool)]
+        results = await asyncio.gather(*pings, return_exceptions=True)
+        if self.connection_layer is not None:
+            # Keep the newest TLS sessions for connections reopened after an idle timeout
+            self.connection_layer.ssl_context.harvest()
+        return [error for error in opened if isinstance(error, Exception)] + \
+            [result if isinstance(result, Exception) else result[0] for result in results]
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for result in await self.heartbeat():
+                if isinstance(result, Exception):
+                    print(f"Heartbeat to {self.region} failed: {result}")